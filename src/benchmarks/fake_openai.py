@@ -0,0 +1,343 @@
+# benchmarks/fake_openai.py
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Answers /v1/chat/completions with deterministic canned responses, including
+streaming (SSE), vision payloads, logprobs for judgments and prompt-cache
+usage details. Latency follows a scriptable distribution, and 429s, 500s
+and timeouts can be injected at given rates. Point the bot at it with
+OPENAI_BASE_URL.
+
+Usage (from src/):
+    python -m benchmarks.fake_openai --port 8001 --latency lognormal:0.4,0.5 \\
+        --rate-429 0.02 --rate-500 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 python main.py
+
+Latency specs (seconds):
+    fixed:0.5            always 0.5
+    uniform:0.1,0.9      uniform between the bounds
+    normal:0.4,0.1       mean, standard deviation (clamped at 0)
+    lognormal:0.4,0.5    median, sigma of the underlying normal
+    exponential:0.4      mean
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+# Approximate characters per token used for the reported usage
+CHARS_PER_TOKEN = 4
+TOKENS_PER_IMAGE = 765
+TOKENS_PER_LOW_DETAIL_IMAGE = 85
+# Upstream prompt caching only applies to prefixes of this many tokens,
+# in steps of PROMPT_CACHE_STEP
+PROMPT_CACHE_MIN = 1024
+PROMPT_CACHE_STEP = 128
+PROMPT_CACHE_SIZE = 10_000
+# Delay between streamed chunks, as a fraction of the sampled latency
+STREAM_CHUNK_SHARE = 0.05
+
+WORDS = (
+    "light river stone window garden silver morning quiet bridge forest "
+    "letter candle mountain harbor winter story market cloud orchard lantern"
+).split()
+VOCABULARY = [
+    ("window", "окно", "She opened the window to let in fresh air."),
+    ("bridge", "мост", "The old bridge crosses the river."),
+    ("candle", "свеча", "He lit a candle on the table."),
+    ("harbor", "гавань", "The boats returned to the harbor at dusk."),
+    ("orchard", "сад", "We picked apples in the orchard."),
+]
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turns a latency spec such as "lognormal:0.4,0.5" into a sampler."""
+    name, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    samplers: Dict[str, Callable[[random.Random], float]] = {
+        "fixed": lambda rng: values[0],
+        "uniform": lambda rng: rng.uniform(values[0], values[1]),
+        "normal": lambda rng: max(0.0, rng.gauss(values[0], values[1])),
+        "lognormal": lambda rng: rng.lognormvariate(math.log(values[0]), values[1]),
+        "exponential": lambda rng: rng.expovariate(1 / values[0]),
+    }
+    if name not in samplers:
+        raise ValueError(f"Unknown latency distribution: {name}")
+    return samplers[name]
+
+
+@dataclass
+class FakeOpenAIConfig:
+    latency: str = "fixed:0.2"
+    rate_429: float = 0.0
+    rate_500: float = 0.0
+    rate_timeout: float = 0.0
+    # How long a "timed out" request hangs before the connection is dropped
+    timeout_hang: float = 120.0
+    seed: int = 0
+
+
+class FakeOpenAI:
+    """aiohttp application that mimics the chat completions endpoint."""
+
+    def __init__(self, config: FakeOpenAIConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.sample_latency = parse_latency(config.latency)
+        self.counters: Counter = Counter()
+        self._prefixes: OrderedDict[str, None] = OrderedDict()
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.counters))
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.counters["requests"] += 1
+
+        roll = self.rng.random()
+        latency = self.sample_latency(self.rng)
+        if roll < self.config.rate_429:
+            self.counters["429"] += 1
+            return self.error(429, "rate_limit_exceeded", {"retry-after-ms": "500"})
+        roll -= self.config.rate_429
+        if roll < self.config.rate_500:
+            self.counters["500"] += 1
+            await asyncio.sleep(latency)
+            return self.error(500, "server_error")
+        roll -= self.config.rate_500
+        if roll < self.config.rate_timeout:
+            self.counters["timeout"] += 1
+            await asyncio.sleep(self.config.timeout_hang)
+            return self.error(504, "timeout")
+
+        content = self.reply(body)
+        usage = self.usage(body["messages"], content)
+        if body.get("stream"):
+            return await self.stream(request, body, content, usage, latency)
+
+        await asyncio.sleep(latency)
+        self.counters["completions"] += 1
+        choice: Dict[str, Any] = {
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }
+        if body.get("logprobs"):
+            choice["logprobs"] = self.logprobs(content, body.get("top_logprobs") or 0)
+        return web.json_response(
+            self.envelope("chat.completion", body, [choice], usage)
+        )
+
+    async def stream(
+        self,
+        request: web.Request,
+        body: Dict[str, Any],
+        content: str,
+        usage: Dict[str, Any],
+        latency: float,
+    ) -> web.StreamResponse:
+        """Sends the reply word by word as server-sent events."""
+        self.counters["streams"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(latency)
+
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else f" {word}"}
+            chunk = self.envelope(
+                "chat.completion.chunk",
+                body,
+                [{"index": 0, "delta": delta, "finish_reason": None}],
+            )
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(latency * STREAM_CHUNK_SHARE)
+
+        final = self.envelope(
+            "chat.completion.chunk",
+            body,
+            [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        )
+        await response.write(f"data: {json.dumps(final)}\n\n".encode())
+        if (body.get("stream_options") or {}).get("include_usage"):
+            tail = self.envelope("chat.completion.chunk", body, [], usage)
+            await response.write(f"data: {json.dumps(tail)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def error(
+        self, status: int, code: str, headers: Optional[Dict[str, str]] = None
+    ) -> web.Response:
+        payload = {"error": {"message": f"Injected {code}", "type": code, "code": code}}
+        return web.json_response(payload, status=status, headers=headers)
+
+    @staticmethod
+    def envelope(
+        kind: str,
+        body: Dict[str, Any],
+        choices: List[Dict[str, Any]],
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        payload = {
+            "id": "chatcmpl-fake",
+            "object": kind,
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": choices,
+        }
+        if usage is not None:
+            payload["usage"] = usage
+        return payload
+
+    def reply(self, body: Dict[str, Any]) -> str:
+        """Builds a deterministic reply that the bot's parsers accept."""
+        messages = body["messages"]
+        text, image_tokens = flatten(messages)
+        digest = int(hashlib.sha256(text.encode("utf-8")).hexdigest(), 16)
+
+        if body.get("max_tokens") == 1 or "'True' or 'False'" in text:
+            return "True" if digest % 4 else "False"
+        if image_tokens:
+            return f"A picture of a {WORDS[digest % len(WORDS)]} in soft light."
+        if "separated by a '|'" in text:
+            word, translation, example = VOCABULARY[digest % len(VOCABULARY)]
+            return f"{word} | {translation} | {example}"
+        if "on its own line" in text:
+            # Every batch is new, otherwise the fact pool would reject it
+            batch = self.counters["requests"]
+            return "\n".join(
+                f"Fact {batch}-{i}: the {WORDS[(digest + i) % len(WORDS)]} "
+                "is older than it looks."
+                for i in range(10)
+            )
+
+        length = 20 + digest % 40
+        return " ".join(WORDS[(digest >> i) % len(WORDS)] for i in range(length)) + "."
+
+    @staticmethod
+    def logprobs(content: str, top: int) -> Dict[str, Any]:
+        other = "False" if content == "True" else "True"
+        candidates = [
+            {"token": content, "logprob": math.log(0.93), "bytes": None},
+            {"token": other, "logprob": math.log(0.06), "bytes": None},
+        ][: max(top, 1)]
+        return {
+            "content": [
+                {
+                    "token": content,
+                    "logprob": candidates[0]["logprob"],
+                    "bytes": None,
+                    "top_logprobs": candidates,
+                }
+            ]
+        }
+
+    def usage(self, messages: List[Dict[str, Any]], content: str) -> Dict[str, Any]:
+        """Reports token usage, simulating the upstream prompt prefix cache."""
+        prompt_tokens = 0
+        cached_tokens = 0
+        prefix = hashlib.sha256()
+        for message in messages:
+            text, image_tokens = flatten([message])
+            prompt_tokens += 4 + len(text) // CHARS_PER_TOKEN + image_tokens
+            prefix.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+            key = prefix.hexdigest()
+            if key in self._prefixes:
+                self._prefixes.move_to_end(key)
+                cached_tokens = prompt_tokens
+            else:
+                self._prefixes[key] = None
+                if len(self._prefixes) > PROMPT_CACHE_SIZE:
+                    self._prefixes.popitem(last=False)
+
+        if cached_tokens < PROMPT_CACHE_MIN:
+            cached_tokens = 0
+        cached_tokens -= cached_tokens % PROMPT_CACHE_STEP
+        completion_tokens = len(content) // CHARS_PER_TOKEN + 1
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+
+
+def flatten(messages: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """Returns the text of the messages and the token cost of their images."""
+    texts = []
+    image_tokens = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    texts.append(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    low = part.get("image_url", {}).get("detail") == "low"
+                    image_tokens += TOKENS_PER_LOW_DETAIL_IMAGE if low else TOKENS_PER_IMAGE
+    return "\n".join(texts), image_tokens
+
+
+async def start_fake_openai(
+    config: FakeOpenAIConfig, host: str = "127.0.0.1", port: int = 0
+) -> Tuple[web.AppRunner, str, FakeOpenAI]:
+    """
+    Starts the fake API in the running event loop.
+
+    Returns:
+        The runner (call `cleanup()` to stop it), the base URL to pass as
+        OPENAI_BASE_URL and the server, whose `counters` hold request stats
+    """
+    fake = FakeOpenAI(config)
+    runner = web.AppRunner(fake.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}/v1", fake
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default="fixed:0.2")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--rate-timeout", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeOpenAIConfig(
+        latency=args.latency,
+        rate_429=args.rate_429,
+        rate_500=args.rate_500,
+        rate_timeout=args.rate_timeout,
+        seed=args.seed,
+    )
+    parse_latency(config.latency)
+    print(f"Fake OpenAI API on http://{args.host}:{args.port}/v1")
+    web.run_app(
+        FakeOpenAI(config).app(), host=args.host, port=args.port, access_log=None
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# benchmarks/fake_telegram.py
+"""
+In-process stand-ins for the Telegram side of the bot: a Bot API session
+that answers every method locally, builders for raw updates, and the
+shared setup used by the load and replay benchmarks.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetMe, TelegramMethod
+
+BOT_TOKEN = "123456:BENCHMARK"
+BOT_ID = 123456
+
+# Per-step counter of executed SQL statements, see count_queries()
+current_queries: ContextVar[Optional[Counter]] = ContextVar(
+    "current_queries", default=None
+)
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Bot API session that never touches the network.
+
+    Methods that target a chat return a synthetic message, getMe returns the
+    benchmark bot and everything else returns True. An optional fixed delay
+    stands in for the Bot API round trip.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1_000_000)
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None
+    ) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, GetMe):
+            result: Any = {
+                "id": BOT_ID,
+                "is_bot": True,
+                "first_name": "Benchmark",
+                "username": "benchmark_bot",
+            }
+        elif getattr(method, "chat_id", None) is not None:
+            result = {
+                "message_id": getattr(method, "message_id", None)
+                or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": method.chat_id, "type": "private"},
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "Benchmark"},
+                "text": getattr(method, "text", None) or "",
+            }
+        else:
+            result = True
+
+        response = self.check_response(
+            bot=bot,
+            method=method,
+            status_code=200,
+            content=json.dumps({"ok": True, "result": result}),
+        )
+        return response.result
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        raise NotImplementedError("File downloads are not simulated")
+        yield b""  # makes this an async generator like the real session
+
+
+class UpdateFactory:
+    """Builds raw Bot API update payloads for synthetic users."""
+
+    def __init__(self):
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def user(user_id: int) -> Dict[str, Any]:
+        return {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": f"User {user_id}",
+            "username": f"user{user_id}",
+        }
+
+    def message(self, user_id: int, text: str) -> Dict[str, Any]:
+        message: Dict[str, Any] = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self.user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [
+                {"type": "bot_command", "offset": 0, "length": len(text.split()[0])}
+            ]
+        return {"update_id": next(self._update_ids), "message": message}
+
+    def callback(self, user_id: int, data: str) -> Dict[str, Any]:
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self.user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": {"id": BOT_ID, "is_bot": True, "first_name": "Benchmark"},
+                    "text": "menu",
+                },
+            },
+        }
+
+
+def prepare_environment(workdir: Optional[str] = None) -> str:
+    """
+    Points the bot's files and database at a scratch directory.
+
+    Must run before any bot module is imported, since they read their
+    configuration at import time. DATABASE_URL is only set if it is missing
+    (SQLite needs the `aiosqlite` package).
+
+    Returns:
+        The scratch directory
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="bot-benchmark-")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault(
+        "DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(workdir, 'bot.db')}"
+    )
+    os.environ.setdefault("FACT_POOL_FILE", os.path.join(workdir, "fact_pool.json"))
+    os.environ.setdefault(
+        "CAPTION_CACHE_FILE", os.path.join(workdir, "caption_cache.json")
+    )
+    os.environ.setdefault(
+        "CONVERSATION_SPOOL_FILE", os.path.join(workdir, "conversation_spool.jsonl")
+    )
+    os.environ.setdefault(
+        "CONVERSATION_DEAD_LETTER_FILE",
+        os.path.join(workdir, "conversation_dead_letter.jsonl"),
+    )
+    # Client-side limits would otherwise throttle the benchmark itself
+    os.environ.setdefault("OPENAI_RPM", "1000000")
+    os.environ.setdefault("OPENAI_TPM", "1000000000")
+    return workdir
+
+
+def quiet_loggers(level: int = logging.WARNING) -> None:
+    """Raises the level of every logger created so far."""
+    for logger in list(logging.root.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger):
+            logger.setLevel(level)
+
+
+def count_queries(engine: Any) -> Counter:
+    """
+    Counts SQL statements executed on `engine`.
+
+    Statements are added to the returned counter under "total" and to the
+    counter in `current_queries`, if the running step has set one.
+    """
+    from sqlalchemy import event
+
+    totals: Counter = Counter()
+
+    def before_cursor_execute(*args: Any) -> None:
+        totals["total"] += 1
+        step = current_queries.get()
+        if step is not None:
+            step["queries"] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return totals
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB (Linux reports KiB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StepStats:
+    """Latency, error and query counts per labelled step."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.queries: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    def record(self, label: str, seconds: float, queries: int, failed: bool) -> None:
+        self.latencies[label].append(seconds)
+        self.queries[label] += queries
+        if failed:
+            self.errors[label] += 1
+
+    def report(self) -> str:
+        header = (
+            f"{'step':<48}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'q/upd':>7}{'errors':>8}"
+        )
+        lines = [header, "-" * len(header)]
+        for label in sorted(self.latencies):
+            samples = self.latencies[label]
+            lines.append(
+                f"{label:<48}{len(samples):>7}"
+                f"{percentile(samples, 0.50) * 1000:>9.1f}"
+                f"{percentile(samples, 0.95) * 1000:>9.1f}"
+                f"{percentile(samples, 0.99) * 1000:>9.1f}"
+                f"{self.queries[label] / len(samples):>7.1f}"
+                f"{self.errors[label]:>8}"
+            )
+        return "\n".join(lines)
+
+
+async def feed(
+    dp: Any, bot: Bot, update: Dict[str, Any], label: str, stats: StepStats
+) -> None:
+    """Feeds one raw update through the dispatcher and records its cost."""
+    step: Counter = Counter()
+    token = current_queries.set(step)
+    started = time.perf_counter()
+    failed = False
+    try:
+        await dp.feed_raw_update(bot, update)
+    except Exception as e:
+        failed = True
+        logging.getLogger(__name__).warning(f"{label} failed: {e!r}")
+    finally:
+        current_queries.reset(token)
+    stats.record(label, time.perf_counter() - started, step["queries"], failed)
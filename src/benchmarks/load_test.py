@@ -0,0 +1,211 @@
+# benchmarks/load_test.py
+"""
+Drives the real dispatcher with synthetic users walking scripted flows.
+
+The dispatcher is built by `main.create_dispatcher()` with every router
+and middleware. Bot API calls go to an in-process fake session and OpenAI
+calls to the local fake API, so only the bot's own code, the database and
+the event loop are measured. Each user repeats one flow (quiz answer loop,
+/talk chat, /translate, vocabulary practice) with random think time.
+
+Reports throughput, per-step p50/p95/p99 latency, SQL statements per
+update, Bot API calls and peak RSS.
+
+Usage (from src/):
+    python -m benchmarks.load_test --users 50 --rounds 5 --openai-latency lognormal:0.3,0.4
+
+DATABASE_URL defaults to a scratch SQLite file, which needs `aiosqlite`;
+set it to a Postgres URL to benchmark the production setup.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import AsyncIterator, Callable, Dict, Tuple
+
+from benchmarks.fake_openai import FakeOpenAIConfig, start_fake_openai
+from benchmarks.fake_telegram import (
+    BOT_TOKEN,
+    FakeTelegramSession,
+    StepStats,
+    UpdateFactory,
+    count_queries,
+    feed,
+    peak_rss_mb,
+    prepare_environment,
+    quiet_loggers,
+)
+
+Step = Tuple[str, Dict]
+Flow = Callable[[UpdateFactory, int, int], AsyncIterator[Step]]
+
+QUIZ_ANSWERS = ["Paris", "1945", "Oxygen", "Jupiter", "I don't know"]
+TALK_MESSAGES = [
+    "What inspired your greatest work?",
+    "How do you deal with failure?",
+    "What would you change about the modern world?",
+    "Tell me about your daily routine.",
+]
+TRANSLATE_TEXTS = [
+    "Good morning, how are you?",
+    "The weather is lovely today.",
+    "Where is the nearest train station?",
+]
+VOCABULARY_ANSWERS = ["окно", "мост", "свеча", "гавань", "сад", "не знаю"]
+
+
+async def quiz_flow(factory: UpdateFactory, user_id: int, rounds: int):
+    from callbacks.factories import QuizCallbackFactory
+
+    yield "quiz:command", factory.message(user_id, "/quiz")
+    yield "quiz:select_topic", factory.callback(
+        user_id, QuizCallbackFactory(action="select_topic", topic_key="science").pack()
+    )
+    for i in range(rounds):
+        yield "quiz:question", factory.callback(
+            user_id, QuizCallbackFactory(action="continue").pack()
+        )
+        yield "quiz:answer", factory.message(
+            user_id, QUIZ_ANSWERS[(user_id + i) % len(QUIZ_ANSWERS)]
+        )
+
+
+async def talk_flow(factory: UpdateFactory, user_id: int, rounds: int):
+    from callbacks.factories import PersonalityCallbackFactory
+
+    yield "talk:command", factory.message(user_id, "/talk")
+    yield "talk:select", factory.callback(
+        user_id, PersonalityCallbackFactory(action="select", key="einstein").pack()
+    )
+    for i in range(rounds):
+        yield "talk:message", factory.message(
+            user_id, TALK_MESSAGES[(user_id + i) % len(TALK_MESSAGES)]
+        )
+
+
+async def translate_flow(factory: UpdateFactory, user_id: int, rounds: int):
+    from callbacks.factories import TranslateCallbackFactory
+
+    yield "translate:command", factory.message(user_id, "/translate")
+    for i in range(rounds):
+        yield "translate:select_lang", factory.callback(
+            user_id,
+            TranslateCallbackFactory(
+                action="select_lang", language_code="es", language_name="Spanish"
+            ).pack(),
+        )
+        yield "translate:text", factory.message(
+            user_id, TRANSLATE_TEXTS[(user_id + i) % len(TRANSLATE_TEXTS)]
+        )
+
+
+async def vocabulary_flow(factory: UpdateFactory, user_id: int, rounds: int):
+    from callbacks.factories import VocabularyCallbackFactory
+
+    yield "vocabulary:command", factory.message(user_id, "/vocabulary")
+    for _ in range(rounds):
+        yield "vocabulary:new_word", factory.callback(
+            user_id, VocabularyCallbackFactory(action="get_new_word").pack()
+        )
+    yield "vocabulary:start_practice", factory.callback(
+        user_id, VocabularyCallbackFactory(action="start_practice").pack()
+    )
+    for i in range(rounds):
+        yield "vocabulary:answer", factory.message(
+            user_id, VOCABULARY_ANSWERS[(user_id + i) % len(VOCABULARY_ANSWERS)]
+        )
+
+
+FLOWS: Dict[str, Flow] = {
+    "quiz": quiz_flow,
+    "talk": talk_flow,
+    "translate": translate_flow,
+    "vocabulary": vocabulary_flow,
+}
+
+
+async def run(args: argparse.Namespace) -> None:
+    prepare_environment()
+    runner, base_url, fake_openai = await start_fake_openai(
+        FakeOpenAIConfig(
+            latency=args.openai_latency,
+            rate_429=args.rate_429,
+            rate_500=args.rate_500,
+            seed=args.seed,
+        )
+    )
+    # Bot modules read OPENAI_BASE_URL and DATABASE_URL when first imported
+    os.environ["OPENAI_BASE_URL"] = base_url
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.enums import ParseMode
+    from database.database import engine
+    from main import create_dispatcher
+
+    quiet_loggers()
+    session = FakeTelegramSession(latency=args.telegram_latency)
+    bot = Bot(
+        token=BOT_TOKEN,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    dp = create_dispatcher()
+    queries = count_queries(engine)
+    stats = StepStats()
+    factory = UpdateFactory()
+    rng = random.Random(args.seed)
+    flows = [FLOWS[name] for name in args.flows]
+
+    async def user(user_id: int) -> None:
+        flow = flows[user_id % len(flows)]
+        async for label, update in flow(factory, user_id, args.rounds):
+            await feed(dp, bot, update, label, stats)
+            if args.think:
+                await asyncio.sleep(rng.expovariate(1 / args.think))
+
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    quiet_loggers()
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(1000 + i) for i in range(args.users)))
+        wall = time.perf_counter() - started
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await runner.cleanup()
+        await engine.dispose()
+
+    updates = sum(len(samples) for samples in stats.latencies.values())
+    print(stats.report())
+    print()
+    print(f"users:              {args.users}")
+    print(f"updates:            {updates}")
+    print(f"wall time:          {wall:.2f} s")
+    print(f"throughput:         {updates / wall:.1f} updates/s")
+    per_update = queries["total"] / max(updates, 1)
+    print(f"sql statements:     {queries['total']} ({per_update:.1f}/update)")
+    print(f"bot api calls:      {sum(session.calls.values())} {dict(session.calls)}")
+    print(f"db pool:            {engine.pool.stats()}")
+    print(f"openai requests:    {dict(fake_openai.counters)}")
+    print(f"peak rss:           {peak_rss_mb():.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--flows", nargs="+", choices=sorted(FLOWS), default=sorted(FLOWS)
+    )
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time, s")
+    parser.add_argument("--openai-latency", default="lognormal:0.3,0.4")
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/openai_concurrency.py
+"""
+Shows that concurrent handlers overlap their OpenAI calls instead of
+running one after another.
+
+The local fake API answers every chat completion after a fixed delay.
+N simulated handlers call `OpenAIClient.get_response` at the same time while
+a heartbeat task measures event loop lag. With a non-blocking client the
+wall time stays close to a single request and the loop never stalls.
+
+Usage (from src/):
+    python -m benchmarks.openai_concurrency --handlers 50 --latency 0.5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from benchmarks.fake_openai import FakeOpenAIConfig, start_fake_openai  # noqa: E402
+from services.openai_client import OpenAIClient, build_http_client  # noqa: E402
+
+
+async def heartbeat(interval: float, lags: list[float], stop: asyncio.Event) -> None:
+    """Records how late the event loop wakes up compared to the requested interval."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run(handlers: int, latency: float) -> None:
+    logging.getLogger("services.openai_client").setLevel(logging.WARNING)
+    runner, base_url, _ = await start_fake_openai(
+        FakeOpenAIConfig(latency=f"fixed:{latency}")
+    )
+    client = OpenAIClient(http_client=build_http_client(), base_url=base_url)
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(0.01, lags, stop))
+
+    async def handler(i: int) -> float:
+        start = time.perf_counter()
+        await client.get_response(f"question {i}")
+        return time.perf_counter() - start
+
+    try:
+        # Warm up the pool so connection setup is not part of the measurement.
+        await handler(-1)
+
+        started = time.perf_counter()
+        durations = await asyncio.gather(*(handler(i) for i in range(handlers)))
+        wall = time.perf_counter() - started
+    finally:
+        stop.set()
+        await beat
+        await client.close()
+        await runner.cleanup()
+
+    serial = handlers * latency
+    print(f"handlers:             {handlers}")
+    print(f"upstream latency:     {latency * 1000:.0f} ms")
+    print(f"wall time:            {wall * 1000:.0f} ms")
+    print(f"serial estimate:      {serial * 1000:.0f} ms")
+    print(f"overlap factor:       {serial / wall:.1f}x")
+    print(f"slowest handler:      {max(durations) * 1000:.0f} ms")
+    print(f"max event loop lag:   {max(lags, default=0) * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--handlers", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(run(args.handlers, args.latency))
+
+
+if __name__ == "__main__":
+    main()
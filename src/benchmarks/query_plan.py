@@ -0,0 +1,206 @@
+# benchmarks/query_plan.py
+"""
+Shows that the conversation history lookup stays O(log n) as the table grows.
+
+The `conversations` table is filled in steps up to the largest --sizes value
+(rows are generated inside the database, spread over --users users and the
+bot's conversation types). After every step the history query issued by
+`crud.get_conversation_history` is timed for random users and its plan is
+checked: it must read ix_conversations_history and stop after LIMIT rows,
+without scanning the table or sorting. With the index the latency stays
+flat from thousands to millions of rows; --drop-index shows the contrast.
+
+Usage (from src/):
+    python -m benchmarks.query_plan --sizes 10000 100000 1000000 10000000
+
+DATABASE_URL defaults to a scratch SQLite file; set it to a scratch
+PostgreSQL database to benchmark the production setup. The benchmark writes
+synthetic rows, so never point it at the bot's real database.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from types import SimpleNamespace
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from benchmarks.fake_telegram import percentile, prepare_environment, quiet_loggers
+
+CONVERSATION_TYPES = [
+    "gpt_interface",
+    "personality_einstein",
+    "personality_shakespeare",
+    "quiz_science",
+    "quiz_history",
+]
+
+POSTGRES_FILL = """
+INSERT INTO conversations (user_id, role, content, conversation_type, "timestamp")
+SELECT n % :users + 1,
+       CASE WHEN n % 2 = 0 THEN 'user' ELSE 'assistant' END,
+       'message ' || n,
+       (CAST(:types AS TEXT[]))[n / :users % :type_count + 1],
+       TIMESTAMPTZ '2024-01-01' + n * INTERVAL '1 second'
+FROM generate_series(:start, :stop - 1) AS n
+"""
+
+SQLITE_FILL = """
+WITH RECURSIVE seq(n) AS (
+    SELECT :start UNION ALL SELECT n + 1 FROM seq WHERE n < :stop - 1
+)
+INSERT INTO conversations (user_id, role, content, conversation_type, "timestamp")
+SELECT n % :users + 1,
+       CASE WHEN n % 2 = 0 THEN 'user' ELSE 'assistant' END,
+       'message ' || n,
+       json_extract(:types, '$[' || (n / :users % :type_count) || ']'),
+       datetime('2024-01-01', '+' || n || ' seconds')
+FROM seq
+"""
+
+
+async def fill_users(conn, users: int) -> None:
+    if conn.dialect.name == "postgresql":
+        await conn.execute(
+            text(
+                "INSERT INTO users (id, telegram_id) "
+                "SELECT n, 900000000 + n FROM generate_series(1, :users) AS n"
+            ),
+            {"users": users},
+        )
+    else:
+        await conn.execute(
+            text(
+                "WITH RECURSIVE seq(n) AS "
+                "(SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :users) "
+                "INSERT INTO users (id, telegram_id) SELECT n, 900000000 + n FROM seq"
+            ),
+            {"users": users},
+        )
+
+
+async def fill_conversations(conn, start: int, stop: int, users: int) -> None:
+    """Adds rows start..stop-1, in batches so SQLite's CTE stays small."""
+    postgres = conn.dialect.name == "postgresql"
+    types = CONVERSATION_TYPES if postgres else json.dumps(CONVERSATION_TYPES)
+    batch = 1_000_000
+    for low in range(start, stop, batch):
+        await conn.execute(
+            text(POSTGRES_FILL if postgres else SQLITE_FILL),
+            {
+                "users": users,
+                "types": types,
+                "type_count": len(CONVERSATION_TYPES),
+                "start": low,
+                "stop": min(stop, low + batch),
+            },
+        )
+
+
+async def explain(conn, user_id: int, conversation_type: str) -> Tuple[List[str], bool]:
+    """
+    Returns:
+        The plan lines of the history query and whether it is index-only
+        ordered (no table scan, no sort)
+    """
+    from database.crud import conversation_history_query
+
+    query = conversation_history_query(user_id, conversation_type).compile(
+        dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+    )
+    if conn.dialect.name == "postgresql":
+        result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"))
+        lines = [row[0] for row in result]
+        plan = "\n".join(lines)
+        good = (
+            "ix_conversations_history" in plan
+            and "Seq Scan" not in plan
+            and "Sort" not in plan
+        )
+    else:
+        result = await conn.execute(text(f"EXPLAIN QUERY PLAN {query}"))
+        lines = [row[-1] for row in result]
+        plan = "\n".join(lines)
+        good = "ix_conversations_history" in plan and "TEMP B-TREE" not in plan
+    return lines, good
+
+
+async def run(args: argparse.Namespace) -> None:
+    prepare_environment()
+    from database.crud import get_conversation_history
+    from database.database import AsyncSessionLocal, engine, run_migrations
+
+    await run_migrations()
+    quiet_loggers()
+    rng = random.Random(args.seed)
+    try:
+        async with engine.begin() as conn:
+            existing = (await conn.execute(text("SELECT COUNT(*) FROM users"))).scalar()
+            if existing:
+                raise SystemExit("DATABASE_URL already has users, use a scratch database")
+            await fill_users(conn, args.users)
+            if args.drop_index:
+                await conn.execute(text("DROP INDEX ix_conversations_history"))
+
+        print(
+            f"{'rows':>12}{'fill s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  plan"
+        )
+        rows = 0
+        lines: List[str] = []
+        for size in sorted(args.sizes):
+            started = time.perf_counter()
+            async with engine.begin() as conn:
+                await fill_conversations(conn, rows, size, args.users)
+                await conn.execute(text("ANALYZE"))
+            fill_seconds = time.perf_counter() - started
+            rows = size
+
+            samples = []
+            async with AsyncSessionLocal() as db:
+                for _ in range(args.samples):
+                    user = SimpleNamespace(id=rng.randint(1, args.users))
+                    conversation_type = rng.choice(CONVERSATION_TYPES)
+                    started = time.perf_counter()
+                    await get_conversation_history(db, user, conversation_type, limit=10)
+                    samples.append(time.perf_counter() - started)
+
+            async with engine.connect() as conn:
+                lines, good = await explain(
+                    conn, rng.randint(1, args.users), rng.choice(CONVERSATION_TYPES)
+                )
+            print(
+                f"{rows:>12,}{fill_seconds:>9.1f}"
+                f"{percentile(samples, 0.50) * 1000:>9.2f}"
+                f"{percentile(samples, 0.95) * 1000:>9.2f}"
+                f"{percentile(samples, 0.99) * 1000:>9.2f}"
+                f"  {'index, no sort' if good else 'SCAN OR SORT'}"
+            )
+
+        print()
+        print(f"plan at {rows:,} rows:")
+        for line in lines:
+            print(f"    {line}")
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000, 10_000_000],
+    )
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--drop-index", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
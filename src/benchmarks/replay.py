@@ -0,0 +1,162 @@
+# benchmarks/replay.py
+"""
+Replays a recorded update trace through the real dispatcher.
+
+Traces are written by the trace middleware when the bot runs with
+TRACE_FILE set. Updates are fed at their recorded inter-arrival times
+divided by --speed (0 replays as fast as possible); each user's updates
+stay in order, different users run concurrently. Bot API and OpenAI calls
+go to the same local fakes as benchmarks.load_test.
+
+Besides latency and throughput, the replay checks every update's FSM
+transition against the recorded one, so behavioural regressions show up
+as mismatches.
+
+Usage (from src/):
+    python -m benchmarks.replay trace.jsonl --speed 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.fake_openai import FakeOpenAIConfig, start_fake_openai
+from benchmarks.fake_telegram import (
+    BOT_TOKEN,
+    FakeTelegramSession,
+    StepStats,
+    count_queries,
+    feed,
+    peak_rss_mb,
+    prepare_environment,
+    quiet_loggers,
+)
+
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def route(update: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    """Returns the (chat id, user id) an update belongs to."""
+    if "message" in update:
+        message = update["message"]
+        return message["chat"]["id"], message.get("from", {}).get("id", 0)
+    if "callback_query" in update:
+        query = update["callback_query"]
+        chat_id = query.get("message", {}).get("chat", {}).get("id", query["from"]["id"])
+        return chat_id, query["from"]["id"]
+    return None
+
+
+def step_label(update: Dict[str, Any], state_before: Optional[str]) -> str:
+    """Groups updates by what they trigger: a command, a callback or a message in a state."""
+    if "callback_query" in update:
+        data = update["callback_query"].get("data") or ""
+        return "callback:" + ":".join(data.split(":")[:2])
+    if "message" in update:
+        text = update["message"].get("text") or ""
+        if text.startswith("/"):
+            return "command:" + text.split()[0]
+        kind = "text" if text else "media"
+        return f"{kind}@{state_before or 'none'}"
+    return "other"
+
+
+async def run(args: argparse.Namespace) -> None:
+    records = load_trace(args.trace)
+    prepare_environment()
+    os.environ.pop("TRACE_FILE", None)
+    runner, base_url, fake_openai = await start_fake_openai(
+        FakeOpenAIConfig(latency=args.openai_latency, seed=args.seed)
+    )
+    # Bot modules read OPENAI_BASE_URL and DATABASE_URL when first imported
+    os.environ["OPENAI_BASE_URL"] = base_url
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.enums import ParseMode
+    from database.database import engine
+    from main import create_dispatcher
+
+    quiet_loggers()
+    session = FakeTelegramSession(latency=args.telegram_latency)
+    bot = Bot(
+        token=BOT_TOKEN,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    dp = create_dispatcher()
+    queries = count_queries(engine)
+    stats = StepStats()
+    mismatches: Counter = Counter()
+
+    per_user: Dict[Tuple[int, int], List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        key = route(record["update"])
+        if key is not None:
+            per_user[key].append(record)
+
+    loop = asyncio.get_running_loop()
+    origin = records[0]["t"] if records else 0.0
+
+    async def replay_user(key: Tuple[int, int], user_records: List[Dict]) -> None:
+        chat_id, user_id = key
+        for record in user_records:
+            if args.speed:
+                delay = start + (record["t"] - origin) / args.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            label = step_label(record["update"], record.get("before"))
+            await feed(dp, bot, record["update"], label, stats)
+
+            context = dp.fsm.get_context(bot=bot, chat_id=chat_id, user_id=user_id)
+            if await context.get_state() != record.get("after"):
+                mismatches[label] += 1
+
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    quiet_loggers()
+    try:
+        start = loop.time()
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(replay_user(key, user_records) for key, user_records in per_user.items())
+        )
+        wall = time.perf_counter() - started
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await runner.cleanup()
+        await engine.dispose()
+
+    updates = sum(len(samples) for samples in stats.latencies.values())
+    recorded_span = (records[-1]["t"] - origin) if records else 0.0
+    print(stats.report())
+    print()
+    print(f"trace:              {args.trace} ({len(records)} updates, {len(per_user)} users)")
+    print(f"recorded span:      {recorded_span:.1f} s")
+    print(f"speed:              {f'{args.speed:g}x' if args.speed else 'max'}")
+    print(f"wall time:          {wall:.2f} s")
+    print(f"throughput:         {updates / wall:.1f} updates/s")
+    print(f"sql statements:     {queries['total']}")
+    print(f"bot api calls:      {sum(session.calls.values())}")
+    print(f"openai requests:    {dict(fake_openai.counters)}")
+    print(f"fsm mismatches:     {sum(mismatches.values())} {dict(mismatches)}")
+    print(f"peak rss:           {peak_rss_mb():.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("trace")
+    parser.add_argument("--speed", type=float, default=1.0, help="0 = as fast as possible")
+    parser.add_argument("--openai-latency", default="lognormal:0.3,0.4")
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
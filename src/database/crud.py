@@ -1,63 +1,109 @@
 # database/crud.py
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import delete
+from sqlalchemy import Row, Select, Update, bindparam, delete, func, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from database.models import (
     User as DBUser,
     Conversation,
+    ConversationSummary,
+    LearnedAnswer,
     QuizResult,
+    QuizUserSummary,
     TranslationHistory,
     VocabularyWord,
 )
 from datetime import datetime, timezone
-from typing import List, Optional
-from utils.logger import get_logger
+from typing import Dict, List, Optional, Tuple
 
-logger = get_logger(__name__)
+# Helpers flush but never commit: the caller owns the transaction, which for
+# handlers is the one DbSessionMiddleware commits after each update. Errors
+# propagate instead of being rolled back here, which would also discard the
+# work the caller flushed earlier; the caller's transaction fails as a whole.
 
 
-async def get_or_create_user(
+def _dialect_insert(db: AsyncSession):
+    """The INSERT construct with ON CONFLICT support for the session's database."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql_insert
+    return sqlite_insert
+
+
+async def upsert_user(
     db: AsyncSession, telegram_id: int, username: Optional[str] = None
-) -> DBUser:
-    """Get user by telegram_id or create new one."""
-    try:
-        result = await db.execute(
-            select(DBUser).where(DBUser.telegram_id == telegram_id)
+) -> Row:
+    """
+    Create a user or update its username in one statement.
+
+    Uses INSERT ... ON CONFLICT (telegram_id) DO UPDATE ... RETURNING, so
+    simultaneous first updates of the same user cannot race.
+
+    Returns:
+        Row with id, telegram_id and username
+    """
+    insert = _dialect_insert(db)
+    stmt = insert(DBUser).values(telegram_id=telegram_id, username=username)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DBUser.telegram_id],
+        set_={"username": stmt.excluded.username},
+    ).returning(DBUser.id, DBUser.telegram_id, DBUser.username)
+    result = await db.execute(stmt)
+    return result.one()
+
+
+# Counter columns of users that increment_user_stats may increment
+STAT_FIELDS = {
+    "total_messages",
+    "random_facts_requested",
+    "gpt_queries",
+    "personality_chats",
+    "quizzes_completed",
+    "translations_made",
+    "image_descriptions_generated",
+}
+
+
+def _increment_statement(fields: Tuple[str, ...]) -> Update:
+    """UPDATE users SET field = field + :n, ... for one user id per parameter set."""
+    users = DBUser.__table__
+    return (
+        update(users)
+        .where(users.c.id == bindparam("user_id_"))
+        .values(
+            {
+                **{
+                    field: func.coalesce(users.c[field], 0) + bindparam(f"{field}_")
+                    for field in fields
+                },
+                "last_activity": func.now(),
+            }
         )
-        user = result.scalar_one_or_none()
+    )
 
-        if not user:
-            user = DBUser(telegram_id=telegram_id, username=username)
-            db.add(user)
-            await db.commit()
-            await db.refresh(user)
 
-        return user
-    except Exception as e:
-        logger.error(f"Error getting or creating user: {e}")
-        await db.rollback()
-        raise
+async def increment_user_stats(
+    db: AsyncSession, increments: Dict[int, Dict[str, int]]
+) -> None:
+    """
+    Apply counter increments for many users.
 
+    Users with the same set of fields share one executemany UPDATE, and
+    every column is incremented in SQL, so concurrent writers never lose
+    an increment. The in-memory User objects are not updated.
 
-async def update_user_stats(
-    db: AsyncSession, user: DBUser, stat_field: str, increment: int = 1
-) -> bool:
-    """Update user statistics."""
-    try:
-        if hasattr(user, stat_field):
-            current_value = getattr(user, stat_field, 0)
-            setattr(user, stat_field, current_value + increment)
-            user.last_activity = datetime.now(timezone.utc)
-            await db.commit()
-            await db.refresh(user)
-            return True
-        else:
-            logger.error(f"Invalid stat field: {stat_field}")
-            return False
-    except Exception as e:
-        logger.error(f"Error updating user stats: {e}")
-        await db.rollback()
-        return False
+    Args:
+        db: Database session
+        increments: {user id: {stat field: amount}}
+    """
+    groups: Dict[Tuple[str, ...], List[Dict[str, int]]] = {}
+    for user_id, fields in increments.items():
+        key = tuple(sorted(fields))
+        params = {f"{field}_": amount for field, amount in fields.items()}
+        groups.setdefault(key, []).append({"user_id_": user_id, **params})
+
+    for fields, params in groups.items():
+        await db.execute(_increment_statement(fields), params)
 
 
 async def get_user_stats(db: AsyncSession, telegram_id: int) -> Optional[DBUser]:
@@ -73,58 +119,130 @@ async def save_conversation_message(
     content: str,
     conversation_type: str,
     persona: Optional[str] = None,
-) -> bool:
+) -> None:
     """Save conversation message asynchronously."""
-    try:
-        conversation = Conversation(
-            user_id=user.id,
-            role=role,
-            content=content,
-            conversation_type=conversation_type,
-            persona=persona,
-        )
-        db.add(conversation)
-        await db.commit()
-        await db.refresh(conversation)
-        return True
-    except Exception as e:
-        logger.error(f"Error saving conversation: {e}")
-        await db.rollback()
-        return False
+    conversation = Conversation(
+        user_id=user.id,
+        role=role,
+        content=content,
+        conversation_type=conversation_type,
+        persona=persona,
+    )
+    db.add(conversation)
+    await db.flush()
+
+
+def conversation_history_query(
+    user_id: int,
+    conversation_type: str,
+    limit: int = 10,
+    after_id: Optional[int] = None,
+) -> Select:
+    """Newest messages of a conversation first; served by ix_conversations_history."""
+    stmt = (
+        select(Conversation)
+        .where(Conversation.user_id == user_id)
+        .where(Conversation.conversation_type == conversation_type)
+    )
+    if after_id is not None:
+        stmt = stmt.where(Conversation.id > after_id)
+    return stmt.order_by(Conversation.timestamp.desc(), Conversation.id.desc()).limit(
+        limit
+    )
 
 
 async def get_conversation_history(
-    db: AsyncSession, user: DBUser, conversation_type: str, limit: int = 10
+    db: AsyncSession,
+    user: DBUser,
+    conversation_type: str,
+    limit: int = 10,
+    after_id: Optional[int] = None,
 ) -> List[Conversation]:
-    """Get conversation history asynchronously."""
+    """Get conversation history asynchronously, optionally only after a message id."""
     result = await db.execute(
+        conversation_history_query(user.id, conversation_type, limit, after_id)
+    )
+    conversations = list(result.scalars().all())
+    return conversations[::-1]
+
+
+async def get_conversation_range(
+    db: AsyncSession,
+    user: DBUser,
+    conversation_type: str,
+    after_id: Optional[int],
+    before_id: Optional[int],
+    limit: int,
+) -> List[Conversation]:
+    """Oldest messages first with ids between `after_id` and `before_id` (exclusive)."""
+    stmt = (
         select(Conversation)
         .where(Conversation.user_id == user.id)
         .where(Conversation.conversation_type == conversation_type)
-        .order_by(Conversation.timestamp.desc())
-        .limit(limit)
     )
-    conversations = list(result.scalars().all())
-    return conversations[::-1]
+    if after_id is not None:
+        stmt = stmt.where(Conversation.id > after_id)
+    if before_id is not None:
+        stmt = stmt.where(Conversation.id < before_id)
+    # By id, the order after_id and the stored summaries advance in
+    stmt = stmt.order_by(Conversation.id).limit(limit)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def get_conversation_summary(
+    db: AsyncSession, user: DBUser, conversation_type: str
+) -> Optional[ConversationSummary]:
+    """Get the running summary of a conversation, if there is one."""
+    result = await db.execute(
+        select(ConversationSummary).where(
+            ConversationSummary.user_id == user.id,
+            ConversationSummary.conversation_type == conversation_type,
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def save_conversation_summary(
+    db: AsyncSession,
+    user: DBUser,
+    conversation_type: str,
+    summary: str,
+    last_message_id: int,
+) -> None:
+    """Create or replace the running summary of a conversation."""
+    existing = await get_conversation_summary(db, user, conversation_type)
+    if existing:
+        existing.summary = summary
+        existing.last_message_id = last_message_id
+    else:
+        db.add(
+            ConversationSummary(
+                user_id=user.id,
+                conversation_type=conversation_type,
+                summary=summary,
+                last_message_id=last_message_id,
+            )
+        )
+    await db.flush()
 
 
 async def clear_conversation_history(
     db: AsyncSession, user: DBUser, conversation_type: str
-) -> bool:
+) -> None:
     """Clear conversation history asynchronously."""
-    try:
-        await db.execute(
-            delete(Conversation).where(
-                Conversation.user_id == user.id,
-                Conversation.conversation_type == conversation_type,
-            )
+    await db.execute(
+        delete(Conversation).where(
+            Conversation.user_id == user.id,
+            Conversation.conversation_type == conversation_type,
         )
-        await db.commit()
-        return True
-    except Exception as e:
-        logger.error(f"Error clearing conversation history: {e}")
-        await db.rollback()
-        return False
+    )
+    await db.execute(
+        delete(ConversationSummary).where(
+            ConversationSummary.user_id == user.id,
+            ConversationSummary.conversation_type == conversation_type,
+        )
+    )
 
 
 async def save_quiz_result(
@@ -133,41 +251,73 @@ async def save_quiz_result(
     topic: str,
     correct_answers: int,
     total_questions: int,
-) -> bool:
+) -> None:
     """Save quiz result asynchronously."""
-    try:
-        score_percentage = (
-            (correct_answers / total_questions) * 100 if total_questions > 0 else 0
-        )
-        quiz_result = QuizResult(
-            user_id=user.id,
-            topic=topic,
-            correct_answers=correct_answers,
-            total_questions=total_questions,
-            score_percentage=score_percentage,
+    score_percentage = (
+        (correct_answers / total_questions) * 100 if total_questions > 0 else 0
+    )
+    quiz_result = QuizResult(
+        user_id=user.id,
+        topic=topic,
+        correct_answers=correct_answers,
+        total_questions=total_questions,
+        score_percentage=score_percentage,
+    )
+    db.add(quiz_result)
+
+    insert = _dialect_insert(db)
+    summary = QuizUserSummary.__table__
+    stmt = insert(summary).values(
+        user_id=user.id,
+        topic=topic,
+        quizzes=1,
+        score_sum=score_percentage,
+        best_score=score_percentage,
+    )
+    # GREATEST on PostgreSQL; SQLite's two-argument max() is the same
+    greatest = func.greatest if insert is postgresql_insert else func.max
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[summary.c.user_id, summary.c.topic],
+            set_={
+                "quizzes": summary.c.quizzes + 1,
+                "score_sum": summary.c.score_sum + stmt.excluded.score_sum,
+                "best_score": greatest(
+                    summary.c.best_score, stmt.excluded.best_score
+                ),
+                "updated_at": func.now(),
+            },
         )
-        db.add(quiz_result)
-        await db.commit()
-        await db.refresh(quiz_result)
-        return True
-    except Exception as e:
-        logger.error(f"Error saving quiz result: {e}")
-        await db.rollback()
-        return False
+    )
+    await db.flush()
 
 
 async def get_quiz_stats(
     db: AsyncSession, user: DBUser, topic: Optional[str] = None
 ) -> dict:
-    """Get quiz statistics asynchronously."""
-    stmt = select(QuizResult).where(QuizResult.user_id == user.id)
+    """
+    Get quiz statistics with one aggregate query over the per-topic summaries.
+
+    The summaries hold one row per topic played, so the cost does not grow
+    with the number of quizzes.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        topics = func.string_agg(QuizUserSummary.topic, ",")
+    else:
+        topics = func.group_concat(QuizUserSummary.topic, ",")
+    stmt = select(
+        func.sum(QuizUserSummary.quizzes),
+        func.sum(QuizUserSummary.score_sum),
+        func.max(QuizUserSummary.best_score),
+        topics,
+    ).where(QuizUserSummary.user_id == user.id)
     if topic:
-        stmt = stmt.where(QuizResult.topic == topic)
+        stmt = stmt.where(QuizUserSummary.topic == topic)
 
     result = await db.execute(stmt)
-    results = result.scalars().all()
+    total_quizzes, score_sum, best_score, topics_played = result.one()
 
-    if not results:
+    if not total_quizzes:
         return {
             "total_quizzes": 0,
             "average_score": 0,
@@ -175,17 +325,11 @@ async def get_quiz_stats(
             "topics_played": [],
         }
 
-    total_quizzes = len(results)
-    scores = [float(r.score_percentage) for r in results]
-    average_score = round(sum(scores) / len(scores), 2)
-    best_score = round(max(scores), 2)
-    topics_played = list({r.topic for r in results})
-
     return {
         "total_quizzes": total_quizzes,
-        "average_score": average_score,
-        "best_score": best_score,
-        "topics_played": topics_played,
+        "average_score": round(score_sum / total_quizzes, 2),
+        "best_score": round(best_score, 2),
+        "topics_played": topics_played.split(","),
     }
 
 
@@ -196,80 +340,63 @@ async def save_translation(
     translated_text: str,
     target_language: str,
     source_language: Optional[str] = None,
-) -> bool:
+) -> None:
     """Save translation history asynchronously."""
-    try:
-        translation = TranslationHistory(
-            user_id=user.id,
-            original_text=original_text,
-            translated_text=translated_text,
-            source_language=source_language,
-            target_language=target_language,
-        )
-        db.add(translation)
-        await update_user_stats(db, user, "translations_made")
-        await db.commit()
-        await db.refresh(translation)
-        return True
-    except Exception as e:
-        logger.error(f"Error saving translation: {e}")
-        await db.rollback()
-        return False
+    translation = TranslationHistory(
+        user_id=user.id,
+        original_text=original_text,
+        translated_text=translated_text,
+        source_language=source_language,
+        target_language=target_language,
+    )
+    db.add(translation)
+    await db.flush()
 
 
 async def add_vocabulary_word(
     db: AsyncSession, user: DBUser, word: str, translation: str, language: str
 ) -> bool:
-    """Add word to vocabulary asynchronously."""
-    try:
-        result = await db.execute(
-            select(VocabularyWord).where(
-                VocabularyWord.user_id == user.id,
-                VocabularyWord.word == word,
-                VocabularyWord.language == language,
-            )
-        )
-        if result.scalar_one_or_none():
-            return False
+    """
+    Add word to vocabulary asynchronously.
 
-        vocab_word = VocabularyWord(
-            user_id=user.id, word=word, translation=translation, language=language
+    Returns:
+        False if the user already has the word
+    """
+    insert = _dialect_insert(db)
+    result = await db.execute(
+        insert(VocabularyWord)
+        .values(user_id=user.id, word=word, translation=translation, language=language)
+        .on_conflict_do_nothing(
+            index_elements=[
+                VocabularyWord.user_id,
+                VocabularyWord.word,
+                VocabularyWord.language,
+            ]
         )
-        db.add(vocab_word)
-        await db.commit()
-        await db.refresh(vocab_word)
-        return True
-    except Exception as e:
-        logger.error(f"Error adding vocabulary word: {e}")
-        await db.rollback()
-        return False
+        .returning(VocabularyWord.id)
+    )
+    return result.scalar_one_or_none() is not None
 
 
 async def update_vocabulary_word_stats(
     db: AsyncSession, word_id: int, was_correct: bool
 ) -> Optional[VocabularyWord]:
     """Updates the practice statistics for a vocabulary word."""
-    try:
-        result = await db.execute(
-            select(VocabularyWord).where(VocabularyWord.id == word_id)
-        )
-        word = result.scalar_one_or_none()
-        if not word:
-            return None
-
-        word.times_practiced += 1
-        word.last_practiced = datetime.now(timezone.utc)
-        if was_correct:
-            word.times_correct += 1
-
-        await db.commit()
-        await db.refresh(word)
-        return word
-    except Exception as e:
-        logger.error(f"Error updating vocabulary word stats: {e}")
-        await db.rollback()
+    result = await db.execute(
+        select(VocabularyWord).where(VocabularyWord.id == word_id)
+    )
+    word = result.scalar_one_or_none()
+    if not word:
         return None
 
+    word.times_practiced += 1
+    word.last_practiced = datetime.now(timezone.utc)
+    if was_correct:
+        word.times_correct += 1
+
+    await db.flush()
+    return word
+
 
 async def get_user_vocabulary(
     db: AsyncSession, user: DBUser, language: Optional[str] = None
@@ -282,3 +409,51 @@ async def get_user_vocabulary(
     stmt = stmt.order_by(VocabularyWord.learned_at.desc())
     result = await db.execute(stmt)
     return list(result.scalars().all())
+
+
+async def count_vocabulary_words(db: AsyncSession, user: DBUser, language: str) -> int:
+    """Count a user's words in a language without loading them."""
+    result = await db.execute(
+        select(func.count())
+        .select_from(VocabularyWord)
+        .where(VocabularyWord.user_id == user.id, VocabularyWord.language == language)
+    )
+    return result.scalar_one()
+
+
+async def get_learned_answers(
+    db: AsyncSession, word: str, language: str
+) -> Dict[str, bool]:
+    """Get earlier model verdicts for a word, keyed by normalized answer."""
+    result = await db.execute(
+        select(LearnedAnswer.answer, LearnedAnswer.is_correct).where(
+            LearnedAnswer.word == word,
+            LearnedAnswer.language == language,
+        )
+    )
+    return {answer: is_correct for answer, is_correct in result.all()}
+
+
+async def save_learned_answer(
+    db: AsyncSession, word: str, language: str, answer: str, is_correct: bool
+) -> None:
+    """
+    Remember a model verdict for a normalized answer to a word.
+
+    An upsert, since users practising the same word can send the same
+    answer at the same time.
+    """
+    insert = _dialect_insert(db)
+    stmt = insert(LearnedAnswer).values(
+        word=word, language=language, answer=answer, is_correct=is_correct
+    )
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[
+                LearnedAnswer.word,
+                LearnedAnswer.language,
+                LearnedAnswer.answer,
+            ],
+            set_={"is_correct": stmt.excluded.is_correct},
+        )
+    )
@@ -1,10 +1,16 @@
 # database/database.py
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from database.models import Base
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.engine import make_url
+from database import migrations
+from database.pool import InstrumentedPool
+from utils.config import env_bool, env_float, env_int
 from utils.logger import get_logger
 from dotenv import load_dotenv
 import os
+from typing import Any, Callable, Dict
+from uuid import uuid4
 
 logger = get_logger(__name__)
 
@@ -15,21 +21,87 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL is None:
     raise ValueError("DATABASE_URL environment variable is not set")
 
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30.0)
+# Seconds after which a connection is replaced, -1 keeps it forever
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", False)
+# asyncpg only: per-connection prepared statement cache; disable prepared
+# statements behind PgBouncer in transaction pooling mode
+DB_STATEMENT_CACHE_SIZE = env_int("DB_STATEMENT_CACHE_SIZE", 100)
+DB_PREPARED_STATEMENTS = env_bool("DB_PREPARED_STATEMENTS", True)
+# asyncpg only: server-side statement_timeout in seconds, 0 disables it
+DB_STATEMENT_TIMEOUT = env_float("DB_STATEMENT_TIMEOUT", 0.0)
+
+
+def asyncpg_connect_args() -> Dict[str, Any]:
+    """Driver arguments for asyncpg built from the DB_* settings."""
+    args: Dict[str, Any] = {"server_settings": {"application_name": "telegram-bot"}}
+    if DB_PREPARED_STATEMENTS:
+        args["prepared_statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+    else:
+        # PgBouncer may hand each statement to another server connection, so
+        # nothing is cached and every statement gets a unique name
+        args["statement_cache_size"] = 0
+        args["prepared_statement_cache_size"] = 0
+        args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    if DB_STATEMENT_TIMEOUT > 0:
+        args["server_settings"]["statement_timeout"] = str(
+            int(DB_STATEMENT_TIMEOUT * 1000)
+        )
+    return args
+
+
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,
+    poolclass=InstrumentedPool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=(
+        asyncpg_connect_args()
+        if make_url(DATABASE_URL).get_driver_name() == "asyncpg"
+        else {}
+    ),
 )
 
 AsyncSessionLocal: sessionmaker[AsyncSession] = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# Session.info key of the callbacks registered with run_after_commit
+AFTER_COMMIT = "after_commit"
+
+
+def run_after_commit(db: AsyncSession, callback: Callable[[], None]) -> None:
+    """
+    Runs `callback` once the session's transaction has committed.
+
+    Used to invalidate caches of database values: invalidating before the
+    commit lets a concurrent reader cache the old value again. The callback
+    is dropped if the transaction rolls back.
+    """
+    db.info.setdefault(AFTER_COMMIT, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_commit_callbacks(session: Session) -> None:
+    for callback in session.info.pop(AFTER_COMMIT, []):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_commit_callbacks(session: Session) -> None:
+    session.info.pop(AFTER_COMMIT, None)
+
 
-async def create_tables():
-    """Create all tables in the database asynchronously."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database tables created successfully")
+async def run_migrations():
+    """Bring the database schema up to date by applying pending migrations."""
+    await migrations.upgrade(engine)
 
 
 async def get_db():
@@ -0,0 +1,132 @@
+# database/migrations/__init__.py
+"""
+Versioned schema migrations.
+
+Every module in this package named `v<NNNN>_<name>.py` is one migration and
+defines `upgrade(conn)`, which receives a synchronous SQLAlchemy connection.
+Applied versions are recorded in the `schema_migrations` table. Pending
+migrations run in version order inside a single transaction, so a failed
+upgrade leaves the schema untouched; on PostgreSQL an advisory lock keeps
+concurrently starting bot instances from migrating twice.
+
+Migrations are frozen once released: they spell out their own tables and
+DDL instead of importing `database.models`, so later model changes never
+alter what an old migration does.
+"""
+import importlib
+import pkgutil
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Set
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import func
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MODULE_NAME = re.compile(r"^v(\d{4})_(\w+)$")
+# Arbitrary key for pg_advisory_xact_lock shared by all bot instances
+LOCK_KEY = 74_318_001
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def load_migrations() -> List[Migration]:
+    """
+    Imports every migration module of this package.
+
+    Returns:
+        Migrations sorted by version
+
+    Raises:
+        RuntimeError: If versions are duplicated or do not start at 1 without gaps
+    """
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = MODULE_NAME.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{__name__}.{module_info.name}")
+        migrations.append(
+            Migration(
+                version=int(match.group(1)),
+                name=match.group(2),
+                upgrade=module.upgrade,
+            )
+        )
+
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if versions != list(range(1, len(versions) + 1)):
+        raise RuntimeError(f"Migration versions must be 1..N without gaps: {versions}")
+    return migrations
+
+
+def applied_versions(conn: Connection) -> Set[int]:
+    """Returns the versions recorded in schema_migrations (creating the table if needed)."""
+    metadata.create_all(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def _upgrade(conn: Connection) -> List[Migration]:
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+
+    done = applied_versions(conn)
+    pending = [m for m in load_migrations() if m.version not in done]
+    for migration in pending:
+        logger.info(f"Applying migration {migration.version:04d}_{migration.name}")
+        migration.upgrade(conn)
+        conn.execute(
+            schema_migrations.insert().values(
+                version=migration.version, name=migration.name
+            )
+        )
+    return pending
+
+
+async def upgrade(engine: AsyncEngine) -> List[Migration]:
+    """
+    Applies all pending migrations.
+
+    Args:
+        engine: Engine of the bot database
+
+    Returns:
+        The migrations that were applied, empty if the schema was current
+    """
+    async with engine.begin() as conn:
+        applied = await conn.run_sync(_upgrade)
+    if applied:
+        logger.info(f"Database schema upgraded to version {applied[-1].version}")
+    else:
+        logger.info("Database schema is up to date")
+    return applied
+
+
+async def status(engine: AsyncEngine) -> List[tuple]:
+    """
+    Returns:
+        (version, name, applied) for every known migration
+    """
+    async with engine.begin() as conn:
+        done = await conn.run_sync(applied_versions)
+    return [(m.version, m.name, m.version in done) for m in load_migrations()]
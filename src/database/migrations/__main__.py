@@ -0,0 +1,33 @@
+# database/migrations/__main__.py
+"""
+Shows or applies schema migrations for DATABASE_URL.
+
+Usage (from src/):
+    python -m database.migrations status
+    python -m database.migrations upgrade
+"""
+import argparse
+import asyncio
+
+from database.database import engine
+from database.migrations import status, upgrade
+
+
+async def run(command: str) -> None:
+    try:
+        if command == "upgrade":
+            await upgrade(engine)
+        for version, name, applied in await status(engine):
+            print(f"{version:04d}_{name:<30} {'applied' if applied else 'pending'}")
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=["status", "upgrade"], nargs="?", default="status")
+    asyncio.run(run(parser.parse_args().command))
+
+
+if __name__ == "__main__":
+    main()
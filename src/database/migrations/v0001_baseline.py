@@ -0,0 +1,119 @@
+# database/migrations/v0001_baseline.py
+"""
+Schema as it was created by `Base.metadata.create_all`.
+
+Tables are only created if missing, so databases set up before migrations
+existed are adopted as version 1 without changes.
+"""
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import func
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("telegram_id", Integer, unique=True, nullable=False),
+    Column("username", String(255), nullable=True),
+    Column("total_messages", Integer),
+    Column("random_facts_requested", Integer),
+    Column("gpt_queries", Integer),
+    Column("personality_chats", Integer),
+    Column("quizzes_completed", Integer),
+    Column("translations_made", Integer),
+    Column("image_descriptions_generated", Integer),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("last_activity", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "conversations",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("role", String(50), nullable=False),
+    Column("content", Text, nullable=False),
+    Column("conversation_type", String(100), nullable=False),
+    Column("persona", String(100), nullable=True),
+    Column("timestamp", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "conversation_summaries",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("conversation_type", String(100), nullable=False),
+    Column("summary", Text, nullable=False),
+    Column("last_message_id", Integer, nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    UniqueConstraint("user_id", "conversation_type"),
+)
+
+Table(
+    "quiz_results",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("topic", String(100), nullable=False),
+    Column("correct_answers", Integer, nullable=False),
+    Column("total_questions", Integer, nullable=False),
+    Column("score_percentage", Float, nullable=False),
+    Column("timestamp", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "translation_history",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("original_text", Text, nullable=False),
+    Column("translated_text", Text, nullable=False),
+    Column("source_language", String(10), nullable=True),
+    Column("target_language", String(10), nullable=False),
+    Column("timestamp", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "vocabulary_words",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("word", String(255), nullable=False),
+    Column("translation", String(255), nullable=False),
+    Column("language", String(10), nullable=False),
+    Column("times_practiced", Integer),
+    Column("times_correct", Integer),
+    Column("learned_at", DateTime(timezone=True), server_default=func.now()),
+    Column("last_practiced", DateTime(timezone=True), nullable=True),
+)
+
+Table(
+    "learned_answers",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("word", String(255), nullable=False),
+    Column("language", String(10), nullable=False),
+    Column("answer", String(255), nullable=False),
+    Column("is_correct", Boolean, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    UniqueConstraint("word", "language", "answer"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    metadata.create_all(conn, checkfirst=True)
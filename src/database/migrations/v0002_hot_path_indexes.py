@@ -0,0 +1,30 @@
+# database/migrations/v0002_hot_path_indexes.py
+"""
+Composite indexes for the per-user lookups on every request.
+
+- conversations: history is filtered by (user_id, conversation_type) and
+  read newest first by (timestamp, id), so the index serves the filter,
+  the order and the LIMIT without a sort.
+- quiz_results: statistics are filtered by (user_id, topic).
+- vocabulary_words: a word is stored once per (user_id, word, language).
+  Duplicates left by concurrent inserts are removed first, keeping the
+  oldest row, whose practice statistics are the ones shown so far.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+STATEMENTS = [
+    'CREATE INDEX IF NOT EXISTS ix_conversations_history '
+    'ON conversations (user_id, conversation_type, "timestamp", id)',
+    "CREATE INDEX IF NOT EXISTS ix_quiz_results_user_topic "
+    "ON quiz_results (user_id, topic)",
+    "DELETE FROM vocabulary_words WHERE id NOT IN ("
+    "SELECT MIN(id) FROM vocabulary_words GROUP BY user_id, word, language)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_vocabulary_words_user_word_language "
+    "ON vocabulary_words (user_id, word, language)",
+]
+
+
+def upgrade(conn: Connection) -> None:
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
@@ -0,0 +1,49 @@
+# database/migrations/v0003_quiz_user_summary.py
+"""
+Per-user, per-topic quiz totals maintained by save_quiz_result, so quiz
+statistics no longer read every result row. Backfilled from quiz_results.
+"""
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import func
+
+metadata = MetaData()
+
+# users is only declared so the foreign key resolves; it already exists
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+quiz_user_summary = Table(
+    "quiz_user_summary",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("topic", String(100), nullable=False),
+    Column("quizzes", Integer, nullable=False),
+    Column("score_sum", Float, nullable=False),
+    Column("best_score", Float, nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    UniqueConstraint("user_id", "topic"),
+)
+
+BACKFILL = """
+INSERT INTO quiz_user_summary (user_id, topic, quizzes, score_sum, best_score)
+SELECT user_id, topic, COUNT(*), SUM(score_percentage), MAX(score_percentage)
+FROM quiz_results
+GROUP BY user_id, topic
+"""
+
+
+def upgrade(conn: Connection) -> None:
+    quiz_user_summary.create(conn)
+    conn.execute(text(BACKFILL))
@@ -1,9 +1,26 @@
 # database/models.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Integer,
+    String,
+    DateTime,
+    ForeignKey,
+    Text,
+    Float,
+    Index,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 
-Base = declarative_base()
+class _EagerDefaults:
+    # Server-generated values (ids, timestamps) come back through INSERT/UPDATE
+    # ... RETURNING, so new rows need no refresh after a flush
+    __mapper_args__ = {"eager_defaults": True}
+
+
+Base = declarative_base(cls=_EagerDefaults)
 
 
 class User(Base):
@@ -35,6 +52,16 @@ class Conversation(Base):
     """Conversation messages history."""
 
     __tablename__ = "conversations"
+    # Serves history reads newest first without a sort
+    __table_args__ = (
+        Index(
+            "ix_conversations_history",
+            "user_id",
+            "conversation_type",
+            "timestamp",
+            "id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -48,10 +75,29 @@ class Conversation(Base):
     user = relationship("User", back_populates="conversations")
 
 
+class ConversationSummary(Base):
+    """Running summary of older turns of a conversation."""
+
+    __tablename__ = "conversation_summaries"
+    __table_args__ = (UniqueConstraint("user_id", "conversation_type"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    conversation_type = Column(String(100), nullable=False)
+    summary = Column(Text, nullable=False)
+    # Newest conversations.id already folded into the summary
+    last_message_id = Column(Integer, nullable=False)
+
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
 class QuizResult(Base):
     """Quiz results and statistics."""
 
     __tablename__ = "quiz_results"
+    __table_args__ = (Index("ix_quiz_results_user_topic", "user_id", "topic"),)
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -65,6 +111,25 @@ class QuizResult(Base):
     user = relationship("User", back_populates="quiz_results")
 
 
+class QuizUserSummary(Base):
+    """Running quiz totals per user and topic, kept by save_quiz_result."""
+
+    __tablename__ = "quiz_user_summary"
+    __table_args__ = (UniqueConstraint("user_id", "topic"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    topic = Column(String(100), nullable=False)
+    quizzes = Column(Integer, nullable=False)
+    # Sum of score_percentage, for the average
+    score_sum = Column(Float, nullable=False)
+    best_score = Column(Float, nullable=False)
+
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
 class TranslationHistory(Base):
     """Translation requests history."""
 
@@ -84,6 +149,15 @@ class VocabularyWord(Base):
     """Vocabulary trainer words."""
 
     __tablename__ = "vocabulary_words"
+    __table_args__ = (
+        Index(
+            "uq_vocabulary_words_user_word_language",
+            "user_id",
+            "word",
+            "language",
+            unique=True,
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -95,3 +169,19 @@ class VocabularyWord(Base):
 
     learned_at = Column(DateTime(timezone=True), server_default=func.now())
     last_practiced = Column(DateTime(timezone=True), nullable=True)
+
+
+class LearnedAnswer(Base):
+    """Model verdicts on vocabulary answers, reused to grade them locally."""
+
+    __tablename__ = "learned_answers"
+    __table_args__ = (UniqueConstraint("word", "language", "answer"),)
+
+    id = Column(Integer, primary_key=True)
+    word = Column(String(255), nullable=False)
+    language = Column(String(10), nullable=False)
+    # Normalized answer text
+    answer = Column(String(255), nullable=False)
+    is_correct = Column(Boolean, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,96 @@
+# database/pool.py
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+from sqlalchemy import exc
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    PoolProxiedConnection,
+)
+
+# Recent checkout times kept for percentiles
+SAMPLE_SIZE = 10_000
+
+
+class PoolStats:
+    """
+    Connection pool checkout metrics.
+
+    A checkout is the time a session waits for a connection: near zero when
+    an idle one is available, the connect time when the pool grows, and the
+    queueing time when size + overflow connections are all in use. Pre-ping
+    round trips, if enabled, are included.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.connect_seconds = 0.0
+        self.max_wait = 0.0
+        self._waits: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+
+    def record_checkout(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.max_wait = max(self.max_wait, seconds)
+        self._waits.append(seconds)
+
+    def record_connect(self, seconds: float) -> None:
+        self.connects += 1
+        self.connect_seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def percentile(fraction: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))] * 1000, 2)
+
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_p50_ms": percentile(0.50),
+            "wait_p95_ms": percentile(0.95),
+            "wait_p99_ms": percentile(0.99),
+            "wait_max_ms": round(self.max_wait * 1000, 2),
+            "connects": self.connects,
+            "connect_avg_ms": (
+                round(self.connect_seconds / self.connects * 1000, 2)
+                if self.connects
+                else 0.0
+            ),
+        }
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """The default async engine pool, timing every checkout into `pool_stats`."""
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        pool_stats.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def _create_connection(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        entry = super()._create_connection()
+        pool_stats.record_connect(time.perf_counter() - started)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        """Checkout metrics plus the current pool occupancy."""
+        return {
+            **pool_stats.stats(),
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+        }
+
+
+pool_stats = PoolStats()
@@ -8,11 +8,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from states.bot_states import GPTStates
 from services.openai_client import openai_client
+from services.context_builder import context_builder
+from services.conversation_writer import conversation_writer
+from services.stats_counter import stats_counter
 from keyboards.gpt_interface import get_gpt_interface_keyboard, get_gpt_actions_keyboard
 from keyboards.start_menu import get_main_menu_keyboard
 from utils.logger import get_logger
+from utils.live_message import LiveMessage
 
-from database.crud import save_conversation_message, update_user_stats
 from database.models import User as DbUser
 from lexicon.prompts import GPT_SYSTEM_PROMPT
 from callbacks.factories import GPTCallbackFactory
@@ -35,7 +38,7 @@ async def command_gpt_handler(
     await state.set_state(GPTStates.waiting_for_question)
 
     # --- ИЗМЕНЕНИЕ: Передаем объект db_user ---
-    await update_user_stats(db, db_user, "gpt_queries")
+    stats_counter.add(db_user, "gpt_queries")
 
     await message.answer(
         "🤖 <b>ChatGPT Interface</b>\n\n"
@@ -77,36 +80,35 @@ async def state_gpt_process_question_handler(
 
     user_question = message.text
     status_message = await message.answer("⏳ Processing your question...")
+    live = LiveMessage(
+        status_message,
+        header="🤖 <b>ChatGPT Response:</b>\n\n",
+        reply_markup=get_gpt_actions_keyboard(),
+    )
 
     try:
-        await save_conversation_message(
-            db=db,
+        conversation_writer.enqueue(
             user=db_user,
             role="user",
             content=user_question,
             conversation_type="gpt_interface",
         )
 
-        # --- ИЗМЕНЕНИЕ: Используем промпт из lexicon ---
-        response = await openai_client.get_response(
-            user_message=user_question,
-            system_prompt=GPT_SYSTEM_PROMPT,
-        )
+        messages = context_builder.build(GPT_SYSTEM_PROMPT, [], user_question)
+        async for delta in openai_client.stream_conversation_response(
+            messages=messages, feature="gpt"
+        ):
+            await live.append(delta)
+        response = await live.finish()
 
         if response:
-            await save_conversation_message(
-                db=db,
+            conversation_writer.enqueue(
                 user=db_user,
                 role="assistant",
                 content=response,
                 conversation_type="gpt_interface",
             )
-
-            await status_message.edit_text(
-                f"🤖 <b>ChatGPT Response:</b>\n\n{response}",
-                reply_markup=get_gpt_actions_keyboard(),
-            )
-            await update_user_stats(db=db, user=db_user, stat_field="total_messages")
+            stats_counter.add(user=db_user, stat_field="total_messages")
             logger.info(f"GPT response sent to user {db_user.telegram_id}")
         else:
             await status_message.edit_text(
@@ -117,7 +119,7 @@ async def state_gpt_process_question_handler(
         logger.error(
             f"Error processing GPT question for user {db_user.telegram_id}: {e}"
         )
-        await status_message.edit_text(
+        await live.message.edit_text(
             "❌ An error occurred while processing your question. Please try again.",
             reply_markup=get_gpt_actions_keyboard(),
         )
@@ -9,9 +9,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from keyboards.image import get_image_interface_keyboard
 from states.bot_states import VisionStates
 from services.openai_client import openai_client
+from services.image_processing import pick_photo_size, prepare_image_async
+from services.caption_cache import caption_cache
+from services.stats_counter import stats_counter
 
 from database.models import User as DbUser
-from database.crud import update_user_stats
 from lexicon.prompts import IMAGE_DESCRIPTION_PROMPT
 from utils.logger import get_logger
 from callbacks.factories import ImageCallbackFactory
@@ -34,7 +36,7 @@ async def command_image_handler(
     await state.clear()
     await state.set_state(VisionStates.waiting_for_image)
 
-    await update_user_stats(db, db_user, "image_descriptions_generated")
+    stats_counter.add(db_user, "image_descriptions_generated")
 
     await message.answer(
         "Send me an image and I'll generate a description for it!",
@@ -65,12 +67,17 @@ async def state_vision_process_image_handler(
     Sends the caption back to the user and clears the current state.
     """
     file_id = None
+    file_unique_id = None
+    mime_type = None
 
     if message.photo:
-        file_id = message.photo[-1].file_id
+        photo = pick_photo_size(message.photo)
+        file_id, file_unique_id = photo.file_id, photo.file_unique_id
     elif message.document:
         if "image" in (message.document.mime_type or ""):
             file_id = message.document.file_id
+            file_unique_id = message.document.file_unique_id
+            mime_type = message.document.mime_type
         else:
             await message.answer(
                 "Only images are supported. Please send an image. (jpg, png, etc.)"
@@ -84,13 +91,22 @@ async def state_vision_process_image_handler(
     status_message = await message.answer("⏳ Processing image...")
 
     try:
-        file_info = await bot.get_file(file_id)
-        downloaded_file = await bot.download_file(file_info.file_path)
-        image_bytes = downloaded_file.read()
-
-        caption = await openai_client.describe_image(
-            image_bytes=image_bytes, prompt=IMAGE_DESCRIPTION_PROMPT
-        )
+        caption = caption_cache.get_by_file(file_unique_id)
+        if caption is None:
+            file_info = await bot.get_file(file_id)
+            downloaded_file = await bot.download_file(file_info.file_path)
+            image = await prepare_image_async(downloaded_file.read(), mime_type)
+
+            caption = caption_cache.get_by_hash(image.phash)
+            if caption is None:
+                caption = await openai_client.describe_image(
+                    image_bytes=image.data,
+                    prompt=IMAGE_DESCRIPTION_PROMPT,
+                    mime_type=image.mime_type,
+                    detail=image.detail,
+                )
+            if caption:
+                caption_cache.set(file_unique_id, image.phash, caption)
 
         await status_message.edit_text(
             caption or "Unfortunately, I could not generate a caption for this image."
@@ -8,6 +8,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from keyboards.start_menu import get_main_menu_keyboard
 from states.bot_states import QuizStates
 from services.openai_client import openai_client
+from services.context_builder import context_builder, CONTEXT_HISTORY_LIMIT
+from services.conversation_writer import conversation_writer
+from services.stats_counter import stats_counter
 
 from keyboards.quiz import (
     get_quiz_confirmation_keyboard,
@@ -19,13 +22,12 @@ from utils.logger import get_logger
 
 from database.crud import (
     clear_conversation_history,
+    get_quiz_stats,
     save_quiz_result,
-    save_conversation_message,
-    get_conversation_history,
-    update_user_stats,
 )
-from database.models import User as DbUser
+from database.models import Conversation, User as DbUser
 from callbacks.factories import QuizCallbackFactory
+from lexicon.messages import get_quiz_welcome_text
 from lexicon.prompts import get_quiz_question_prompt, QUIZ_ANSWER_CHECK_PROMPT
 from lexicon.topics import QUIZ_TOPICS
 
@@ -37,12 +39,13 @@ priority = 50
 
 @router.message(Command("quiz"))
 async def command_quiz_handler(
-    message: Message, state: FSMContext, db_user: DbUser
+    message: Message, state: FSMContext, db: AsyncSession, db_user: DbUser
 ) -> None:
     await state.clear()
     await state.set_state(QuizStates.choosing_topic)
+    stats = await get_quiz_stats(db, db_user)
     await message.answer(
-        "<b>Quiz time!</b>\n\n" "Please, choose a topic for the quiz:",
+        get_quiz_welcome_text(stats),
         reply_markup=get_quiz_topic_selection_keyboard(),
     )
     logger.info(f"User {db_user.telegram_id} started quiz")
@@ -73,6 +76,7 @@ async def quiz_select_topic_callback(
         return
 
     conversation_type = f"quiz_{topic_key}"
+    await conversation_writer.discard(db_user.id, conversation_type)
     await clear_conversation_history(db, db_user, conversation_type)
 
     await state.update_data(topic=topic_key)
@@ -115,21 +119,25 @@ async def quiz_continue_callback(
 
     try:
         conversation_type = f"quiz_{topic_key}"
-        history_db = await get_conversation_history(db, db_user, conversation_type, 10)
-        history_openai = [
-            {"role": msg.role, "content": msg.content} for msg in history_db
-        ]
-
+        history_db = await conversation_writer.get_history(
+            db, db_user, conversation_type, CONTEXT_HISTORY_LIMIT
+        )
         system_prompt = get_quiz_question_prompt(QUIZ_TOPICS[topic_key]["name"])
-        messages = [{"role": "system", "content": system_prompt}, *history_openai]
+        messages = context_builder.build(system_prompt, history_db)
 
-        response = await openai_client.get_conversation_response(messages=messages)
+        response = await openai_client.get_conversation_response(
+            messages=messages, coalesce=True, feature="quiz"
+        )
         if response:
             await status_message.edit_text(response, reply_markup=get_answer_keyboard())
-            await save_conversation_message(
-                db, db_user, "assistant", response, conversation_type
-            )
+            conversation_writer.enqueue(db_user, "assistant", response, conversation_type)
+            await state.update_data(question=response)
             await state.set_state(QuizStates.waiting_for_answer)
+        else:
+            await status_message.edit_text(
+                "⚠️ Could not generate a question. Please try again.",
+                reply_markup=get_post_answer_keyboard(),
+            )
     except Exception as e:
         logger.error(f"Error getting response from OpenAI: {e}")
         await status_message.edit_text(
@@ -147,7 +155,8 @@ async def state_quiz_process_answer_handler(
 
     data = await state.get_data()
     topic_key = data.get("topic")
-    if not topic_key:
+    question = data.get("question")
+    if not topic_key or not question:
         await message.answer(
             "⚠️ Session expired. Please start a new quiz.",
             reply_markup=get_main_menu_keyboard(),
@@ -158,34 +167,36 @@ async def state_quiz_process_answer_handler(
     status_message = await message.answer("⏳ Processing your answer...")
     try:
         conversation_type = f"quiz_{topic_key}"
-        await save_conversation_message(
-            db, db_user, "user", message.text, conversation_type
+        messages = context_builder.build(
+            QUIZ_ANSWER_CHECK_PROMPT,
+            [Conversation(role="assistant", content=question)],
+            message.text,
         )
 
-        history_db = await get_conversation_history(db, db_user, conversation_type, 2)
-        history_openai = [
-            {"role": msg.role, "content": msg.content} for msg in history_db
-        ]
-        messages = [
-            {"role": "system", "content": QUIZ_ANSWER_CHECK_PROMPT},
-            *history_openai,
-        ]
-
-        response = await openai_client.get_conversation_response(messages=messages)
-        if response:
-            await save_conversation_message(
-                db, db_user, "assistant", response, conversation_type
+        verdict = await openai_client.judge(messages, feature="quiz")
+        if verdict:
+            is_correct = verdict.value
+            conversation_writer.enqueue(
+                db_user, "user", message.text, conversation_type
+            )
+            conversation_writer.enqueue(
+                db_user, "assistant", str(is_correct), conversation_type
             )
-            is_correct = response.strip().lower() == "true"
             correct = data.get("correct_answers", 0) + (1 if is_correct else 0)
             total = data.get("total_questions", 0) + 1
             await state.update_data(correct_answers=correct, total_questions=total)
+            # One answer per question: further messages are not graded again
+            await state.set_state(QuizStates.showing_result)
             result_text = f"{'✅ Correct!' if is_correct else '❌ Incorrect!'}\nSession progress: {correct}/{total} correct"
             await status_message.edit_text(result_text)
             await message.answer(
                 "What would you like to do next?",
                 reply_markup=get_post_answer_keyboard(),
             )
+        else:
+            await status_message.edit_text(
+                "⚠️ Could not check your answer. Please send it again."
+            )
     except Exception as e:
         logger.error(f"Error processing quiz answer: {e}")
         await status_message.edit_text(
@@ -216,10 +227,11 @@ async def finish_quiz_session(db: AsyncSession, user: DbUser, state: FSMContext)
 
     if topic_key and total > 0:
         await save_quiz_result(db, user, topic_key, correct, total)
-        await update_user_stats(db, user, "quizzes_completed")
+        stats_counter.add(user, "quizzes_completed")
 
     await state.clear()
 
     if topic_key:
         conversation_type = f"quiz_{topic_key}"
+        await conversation_writer.discard(user.id, conversation_type)
         await clear_conversation_history(db, user, conversation_type)
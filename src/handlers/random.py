@@ -9,8 +9,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from keyboards.random_fact import get_random_fact_actions_keyboard
 from utils.logger import get_logger
 from services.openai_client import openai_client
+from services.fact_pool import fact_pool
+from services.stats_counter import stats_counter
 
-from database.crud import update_user_stats
 from database.models import User as DbUser
 from lexicon.prompts import RANDOM_FACT_PROMPT
 from callbacks.factories import RandomCallbackFactory
@@ -27,17 +28,30 @@ async def command_random_handler(
 ) -> None:
     """
     Handles the /random command.
-    Sends a random fact to the user from ChatGPT.
+    Sends a pre-generated fact from the fact pool, or asks ChatGPT directly
+    if the pool is empty.
     """
     await state.clear()
+    stats_counter.add(db_user, "random_facts_requested")
+
+    fact = fact_pool.get_fact()
+    if fact:
+        await message.answer(
+            f"📜 {fact}", reply_markup=get_random_fact_actions_keyboard()
+        )
+        return
 
     status_message = await message.answer("⏳ Generating a random fact...")
 
     try:
-        await update_user_stats(db, db_user, "random_facts_requested")
-        response = await openai_client.get_response(RANDOM_FACT_PROMPT)
+        response = await openai_client.get_response(
+            RANDOM_FACT_PROMPT, coalesce=True, feature="random"
+        )
     except Exception as e:
         logger.error(f"Error generating random fact: {e}")
+        response = None
+
+    if not response:
         response = "⚠️ An error occurred while generating a random fact."
 
     await status_message.edit_text(
@@ -8,18 +8,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from states.bot_states import PersonalityStates
 from services.openai_client import openai_client
+from services.context_builder import context_builder, CONTEXT_HISTORY_LIMIT
+from services.summarizer import summarizer
+from services.conversation_writer import conversation_writer
+from services.stats_counter import stats_counter
 from keyboards.personality import (
     get_personality_selection_keyboard,
     get_personality_actions_keyboard,
 )
 from keyboards.start_menu import get_main_menu_keyboard
 from utils.logger import get_logger
+from utils.live_message import LiveMessage
 
-from database.crud import (
-    save_conversation_message,
-    get_conversation_history,
-    update_user_stats,
-)
+from database.crud import get_conversation_summary
 from database.models import User as DbUser
 from lexicon.prompts import PERSONALITY_PROMPTS, PERSONALITY_NAMES
 from lexicon.messages import (
@@ -80,7 +81,7 @@ async def talk_select_personality_callback(
         return
 
     # --- ИЗМЕНЕНИЕ: Обновляем статистику ---
-    await update_user_stats(db, db_user, "personality_chats")
+    stats_counter.add(db_user, "personality_chats")
 
     await state.update_data(personality=personality_key)
     await state.set_state(PersonalityStates.chatting_with_personality)
@@ -117,36 +118,48 @@ async def state_personality_chat_handler(
         return
 
     status_message = await message.answer("🤔 Thinking...")
+    personality_name = PERSONALITY_NAMES[personality_key]
+    live = LiveMessage(
+        status_message,
+        header=f"💬 <b>{personality_name}:</b>\n\n",
+        reply_markup=get_personality_actions_keyboard(),
+    )
     try:
         conversation_type = f"personality_{personality_key}"
-        history_db = await get_conversation_history(db, db_user, conversation_type, 10)
-        history_openai = [
-            {"role": msg.role, "content": msg.content} for msg in history_db
-        ]
-
-        system_prompt = PERSONALITY_PROMPTS[personality_key]
-        messages = [
-            {"role": "system", "content": system_prompt},
-            *history_openai,
-            {"role": "user", "content": user_message},
-        ]
-
-        response = await openai_client.get_conversation_response(
-            messages=messages, temperature=0.8
+        summary = await get_conversation_summary(db, db_user, conversation_type)
+        history_db = await conversation_writer.get_history(
+            db,
+            db_user,
+            conversation_type,
+            CONTEXT_HISTORY_LIMIT,
+            after_id=summary.last_message_id if summary else None,
+        )
+        messages = context_builder.build(
+            PERSONALITY_PROMPTS[personality_key],
+            history_db,
+            user_message,
+            summary=summary.summary if summary else None,
         )
 
+        async for delta in openai_client.stream_conversation_response(
+            messages=messages, temperature=0.8, feature="talk"
+        ):
+            await live.append(delta)
+        response = await live.finish()
+
         if response:
-            await save_conversation_message(
-                db, db_user, "user", user_message, conversation_type, personality_key
+            conversation_writer.enqueue(
+                db_user, "user", user_message, conversation_type, personality_key
             )
-            await save_conversation_message(
-                db, db_user, "assistant", response, conversation_type, personality_key
+            conversation_writer.enqueue(
+                db_user, "assistant", response, conversation_type, personality_key
             )
-
-            personality_name = PERSONALITY_NAMES[personality_key]
-            await status_message.edit_text(
-                f"💬 <b>{personality_name}:</b>\n\n{response}",
-                reply_markup=get_personality_actions_keyboard(),
+            summarizer.schedule_if_needed(
+                db_user,
+                conversation_type,
+                history_db,
+                new_tokens=context_builder.text_tokens(user_message)
+                + context_builder.text_tokens(response),
             )
             logger.info(
                 f"Personality {personality_key} responded to user {db_user.telegram_id}"
@@ -158,7 +171,7 @@ async def state_personality_chat_handler(
             )
     except Exception as e:
         logger.error(f"Error in personality chat for user {db_user.telegram_id}: {e}")
-        await status_message.edit_text(
+        await live.message.edit_text(
             "❌ An error occurred. Please try again.",
             reply_markup=get_personality_actions_keyboard(),
         )
@@ -8,10 +8,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from keyboards.translate import get_language_keyboard
 from states.bot_states import TranslatorStates
 from services.openai_client import openai_client
+from services.stats_counter import stats_counter
 from utils.logger import get_logger
 
 from database.models import User as DbUser
-from database.crud import save_translation, update_user_stats
+from database.crud import save_translation
 from callbacks.factories import TranslateCallbackFactory, StartCallbackFactory
 from lexicon.prompts import get_translation_prompt
 from lexicon.messages import (
@@ -99,7 +100,9 @@ async def process_translation_handler(
 
     try:
         prompt = get_translation_prompt(original_text, target_lang_name)
-        translated_text = await openai_client.get_response(prompt)
+        translated_text = await openai_client.get_response(
+            prompt, cache=True, feature="translate"
+        )
 
         if not translated_text:
             await status_message.edit_text("Sorry, I couldn't translate this text.")
@@ -112,6 +115,7 @@ async def process_translation_handler(
             translated_text=translated_text,
             target_language=target_lang_name,
         )
+        stats_counter.add(db_user, "translations_made")
 
         result_text = get_translation_result_text(
             original_text, translated_text, target_lang_name
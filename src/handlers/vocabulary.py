@@ -1,5 +1,6 @@
 # handlers/vocabulary.py
 import random
+from functools import partial
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
@@ -7,15 +8,20 @@ from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from states.bot_states import VocabularyStates
+from services.answer_matcher import answer_matcher, normalize
 from services.openai_client import openai_client
+from services.vocabulary_counts import vocabulary_counts
 from keyboards.vocabulary import get_vocabulary_actions_keyboard, get_practice_keyboard
 from utils.logger import get_logger
 
 from database.models import User as DbUser
+from database.database import run_after_commit
 from database.crud import (
     get_user_vocabulary,
     add_vocabulary_word,
     update_vocabulary_word_stats,
+    get_learned_answers,
+    save_learned_answer,
 )
 from callbacks.factories import VocabularyCallbackFactory
 from lexicon.prompts import GET_NEW_WORD_PROMPT, get_word_validation_prompt
@@ -41,8 +47,8 @@ async def show_vocabulary_menu(
 ):
     """Displays the main vocabulary menu and sets the learning_mode state."""
     await state.set_state(VocabularyStates.learning_mode)
-    user_words = await get_user_vocabulary(db, db_user, "en")
-    text = get_vocabulary_welcome_text(len(user_words))
+    word_count = await vocabulary_counts.get(db, db_user, "en")
+    text = get_vocabulary_welcome_text(word_count)
 
     msg_to_edit_or_answer = message if isinstance(message, Message) else message.message
 
@@ -106,14 +112,19 @@ async def get_new_word_callback(
     status_message = await callback.message.edit_text("🤔 Searching for a new word...")
 
     try:
-        response = await openai_client.get_response(GET_NEW_WORD_PROMPT)
+        response = await openai_client.get_response(
+            GET_NEW_WORD_PROMPT, feature="vocabulary"
+        )
         if not response or response.count("|") != 2:
             await status_message.edit_text("Failed to get a word, please try again.")
             await show_vocabulary_menu(callback, state, db, db_user)
             return
 
         word, translation, example = map(str.strip, response.split("|"))
-        await add_vocabulary_word(db, db_user, word, translation, "en")
+        if await add_vocabulary_word(db, db_user, word, translation, "en"):
+            run_after_commit(
+                db, partial(vocabulary_counts.invalidate, db_user.id, "en")
+            )
         text = format_new_word_message(word, translation, example)
         await status_message.edit_text(
             text, reply_markup=get_vocabulary_actions_keyboard()
@@ -144,7 +155,9 @@ async def start_practice_callback(
 
     await callback.message.edit_text(PRACTICE_START_TEXT)
 
-    practice_words = [{"id": w.id, "word": w.word} for w in words]
+    practice_words = [
+        {"id": w.id, "word": w.word, "translation": w.translation} for w in words
+    ]
     random.shuffle(practice_words)
 
     await state.update_data(
@@ -171,9 +184,27 @@ async def practice_answer_handler(
     status_message = await message.answer("⏳ Checking...")
 
     try:
-        prompt = get_word_validation_prompt(current_word["word"], user_answer)
-        response = await openai_client.get_response(prompt)
-        is_correct = response.strip().lower() == "true"
+        word = current_word["word"]
+        learned = await get_learned_answers(db, word, "en")
+        is_correct = answer_matcher.match(
+            user_answer, current_word.get("translation", ""), learned
+        )
+
+        if is_correct is None:
+            prompt = get_word_validation_prompt(word, user_answer)
+            verdict = await openai_client.judge(
+                [{"role": "user", "content": prompt}], feature="vocabulary"
+            )
+            if verdict is None:
+                await status_message.edit_text(
+                    "⚠️ Could not check your answer. Please send it again."
+                )
+                return
+            is_correct = verdict.value
+            if verdict.confidence >= answer_matcher.learn_confidence:
+                await save_learned_answer(
+                    db, word, "en", normalize(user_answer)[:255], is_correct
+                )
 
         await update_vocabulary_word_stats(db, current_word["id"], is_correct)
 
@@ -74,6 +74,17 @@ def get_translation_result_text(original: str, translation: str, language: str)
     )
 
 
+def get_quiz_welcome_text(stats: dict) -> str:
+    text = "<b>Quiz time!</b>\n\n"
+    if stats["total_quizzes"]:
+        text += (
+            f"Quizzes played: {stats['total_quizzes']}, "
+            f"average score {stats['average_score']:.0f}%, "
+            f"best {stats['best_score']:.0f}%\n\n"
+        )
+    return text + "Please, choose a topic for the quiz:"
+
+
 def get_vocabulary_welcome_text(words_count: int) -> str:
     return (
         f"📚 **Vocabulary Trainer**\n\n"
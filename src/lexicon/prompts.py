@@ -8,18 +8,34 @@ RANDOM_FACT_PROMPT = (
     "Tell me a random, interesting, short fact that hasn't been said before."
 )
 
+
+def get_random_facts_batch_prompt(count: int) -> str:
+    """Returns the prompt for generating several random facts at once."""
+    return (
+        f"Tell me {count} random, interesting, short facts on different topics. "
+        "Write each fact on its own line. "
+        "Do not number them and do not add any other text."
+    )
+
+
 IMAGE_DESCRIPTION_PROMPT = "Create a short and creative description for this image."
 
 
 def get_quiz_question_prompt(topic_name: str) -> str:
-    """Returns the system prompt for generating a new quiz question."""
+    """
+    Returns the system prompt for generating a new quiz question.
+
+    The static instructions come first and the topic last, so prompts for
+    all topics share a cacheable prefix.
+    """
     return (
         "You are a helpful assistant. "
         "You have to play a quiz with the user. "
-        f"Your task is to give the user a quiz question on the topic: {topic_name}. "
+        "Your task is to give the user a quiz question on the topic below. "
         "Try not to ask the same question for the same topic. "
         "Do not ask if you should ask another question. "
-        "The question should be clear and concise."
+        "The question should be clear and concise.\n\n"
+        f"Topic: {topic_name}"
     )
 
 
@@ -49,6 +65,27 @@ PERSONALITY_NAMES = {
 }
 
 
+CONVERSATION_SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI "
+    "persona. Update the summary with the new turns. Keep facts about the user, "
+    "topics discussed, open questions and promises made. "
+    "Write at most 150 words in the third person. Output only the summary."
+)
+
+
+def get_summary_update_prompt(previous_summary: str | None, transcript: str) -> str:
+    """Returns the user prompt for folding new turns into a summary."""
+    return (
+        f"Current summary:\n{previous_summary or '(empty)'}\n\n"
+        f"New turns:\n{transcript}"
+    )
+
+
+def get_summary_context_message(summary: str) -> str:
+    """Returns the system message that carries the summary into the prompt."""
+    return f"Summary of the earlier conversation:\n{summary}"
+
+
 def get_translation_prompt(text: str, target_language: str) -> str:
     """Returns the user prompt for translation."""
     return f"Translate the following text to {target_language}:\n\n{text}"
@@ -5,9 +5,19 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from dotenv import load_dotenv
-from database.database import create_tables
+from database.database import engine, run_migrations
 from middlewares import include_middlewares
 from handlers import include_routers
+from services.openai_client import openai_client
+from services.fact_pool import fact_pool
+from services.summarizer import summarizer
+from services.answer_matcher import answer_matcher
+from services.caption_cache import caption_cache
+from services.conversation_writer import conversation_writer
+from services.stats_counter import stats_counter
+from services.user_cache import user_cache
+from services.vocabulary_counts import vocabulary_counts
+from services.trace_recorder import trace_recorder
 from utils.set_commands import set_commands
 from utils.logger import get_logger
 
@@ -16,22 +26,15 @@ load_dotenv()
 TOKEN = getenv("BOT_TOKEN")
 logger = get_logger(__name__)
 
-if not TOKEN:
-    raise ValueError("BOT_TOKEN is not set in environment variables.")
-
-# Initialize dispatcher with FSM storage
-storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
-
-# Include all routers and middlewares
-include_routers(dp)
-include_middlewares(dp)
-
 
 async def on_startup(bot: Bot) -> None:
     """Actions to perform on bot startup."""
     logger.info("Bot is starting up...")
-    await create_tables()
+    await run_migrations()
+    await conversation_writer.start()
+    await stats_counter.start()
+    await fact_pool.start()
+    await caption_cache.start()
     await set_commands(bot)
     # commands = await bot.get_my_commands()
     # logger.info(f"Bot commands: {commands}")
@@ -43,6 +46,42 @@ async def on_startup(bot: Bot) -> None:
 async def on_shutdown(bot: Bot) -> None:
     """Actions to perform on bot shutdown."""
     logger.info("Bot is shutting down...")
+    await fact_pool.stop()
+    await summarizer.stop()
+    await conversation_writer.stop()
+    await stats_counter.stop()
+    await caption_cache.stop()
+    await trace_recorder.stop()
+    logger.info(f"Response cache stats: {openai_client.cache.stats()}")
+    logger.info(f"Request coalescing stats: {openai_client.single_flight.stats()}")
+    logger.info(f"Rate limiter stats: {openai_client.rate_limiter.stats()}")
+    logger.info(f"Resilience stats: {openai_client.resilience.stats()}")
+    logger.info(f"Prompt cache usage: {openai_client.usage.stats()}")
+    logger.info(f"Answer matcher stats: {answer_matcher.stats()}")
+    logger.info(f"Caption cache stats: {caption_cache.stats()}")
+    logger.info(f"Conversation writer stats: {conversation_writer.stats()}")
+    logger.info(f"User cache stats: {user_cache.stats()}")
+    logger.info(f"Vocabulary count cache: {vocabulary_counts.stats()}")
+    logger.info(f"User stats counter: {stats_counter.stats()}")
+    logger.info(f"Database pool stats: {engine.pool.stats()}")
+    await openai_client.close()
+
+
+def create_dispatcher() -> Dispatcher:
+    """
+    Builds the dispatcher with FSM storage, all routers, middlewares and
+    lifecycle hooks.
+
+    Routers are module-level objects, so this can be called once per process.
+    """
+    dp = Dispatcher(storage=MemoryStorage())
+
+    include_routers(dp)
+    include_middlewares(dp)
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return dp
 
 
 async def main() -> None:
@@ -51,9 +90,7 @@ async def main() -> None:
         raise ValueError("BOT_TOKEN is not set in environment variables.")
 
     bot = Bot(token=TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-
-    dp.startup.register(on_startup)
-    dp.shutdown.register(on_shutdown)
+    dp = create_dispatcher()
 
     await dp.start_polling(bot)
 
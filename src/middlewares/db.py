@@ -7,7 +7,9 @@ from database.database import AsyncSessionLocal
 class DbSessionMiddleware(BaseMiddleware):
     """
     This middleware provides an SQLAlchemy session to the handler.
-    It ensures that the session is properly opened and closed.
+    The session is one unit of work per update: CRUD helpers only flush,
+    and everything is committed once the handler returns. If the handler
+    raises, closing the session rolls the whole update back.
     """
     async def __call__(
         self,
@@ -17,7 +19,10 @@ class DbSessionMiddleware(BaseMiddleware):
     ) -> Any:
         async with AsyncSessionLocal() as session:
             data["db"] = session
-            return await handler(event, data)
+            result = await handler(event, data)
+            if session.in_transaction():
+                await session.commit()
+            return result
 
 priority = 10
 middleware = DbSessionMiddleware()
\ No newline at end of file
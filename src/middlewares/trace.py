@@ -0,0 +1,37 @@
+# middlewares/trace.py
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.types import TelegramObject, Update
+from services.trace_recorder import trace_recorder
+
+
+class TraceMiddleware(BaseMiddleware):
+    """
+    Records every update, with its FSM transition and handling time, to the
+    trace file set by TRACE_FILE. Registered only when TRACE_FILE is set.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        state: FSMContext | None = data.get("state")
+        state_before = await state.get_state() if state else None
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            if isinstance(event, Update):
+                state_after = await state.get_state() if state else None
+                trace_recorder.record(
+                    event, state_before, state_after, time.perf_counter() - started
+                )
+
+
+# Runs first, so the recorded time covers the other middlewares too
+priority = 5
+middleware = TraceMiddleware() if trace_recorder.enabled else None
@@ -2,17 +2,22 @@
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.crud import get_or_create_user
-from database.models import User as DbUser
+from database.crud import upsert_user
+from database.database import AsyncSessionLocal
+from services.rate_limiter import current_user_id
+from services.user_cache import UserSnapshot, user_cache
 
 
 class UserDataMiddleware(BaseMiddleware):
     """
     This middleware retrieves or creates a user from the database
-    and provides the User model instance to the handler.
-    It depends on DbSessionMiddleware.
+    and provides a snapshot of its row to the handler.
+    Users are cached by Telegram id, so most updates need no query;
+    a miss or a changed username costs one upsert. The upsert commits in
+    its own short transaction before the user is cached, so a failing
+    handler cannot roll back a cached id and the row lock is not held
+    while the handler runs.
     """
 
     async def __call__(
@@ -23,17 +28,25 @@ class UserDataMiddleware(BaseMiddleware):
     ) -> Any:
         raw_user = data.get("event_from_user")
 
-        db: AsyncSession = data["db"]
-
-        db_user: DbUser | None = None
+        db_user: UserSnapshot | None = None
         if raw_user:
-            db_user = await get_or_create_user(
-                db=db,
-                telegram_id=raw_user.id,
-                username=raw_user.username,
-            )
+            db_user = user_cache.get(raw_user.id, raw_user.username)
+            if db_user is None:
+                async with AsyncSessionLocal() as db:
+                    row = await upsert_user(
+                        db=db,
+                        telegram_id=raw_user.id,
+                        username=raw_user.username,
+                    )
+                    await db.commit()
+                db_user = UserSnapshot(
+                    id=row.id, telegram_id=row.telegram_id, username=row.username
+                )
+                user_cache.set(db_user)
 
         data["db_user"] = db_user
+        if raw_user:
+            current_user_id.set(raw_user.id)
 
         return await handler(event, data)
 
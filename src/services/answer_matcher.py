@@ -0,0 +1,126 @@
+# services/answer_matcher.py
+import re
+from typing import Dict, List, Optional
+from utils.config import env_float
+
+# Separators between alternative translations, e.g. "дом, жилище; здание"
+ALTERNATIVES = re.compile(r"[,;/|]|\bили\b")
+# Explanatory notes such as "(разг.)" are not part of the expected answer
+PARENTHESES = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+NON_WORD = re.compile(r"[^\w\s-]+")
+WHITESPACE = re.compile(r"\s+")
+# Common Russian inflection endings, longest first
+ENDINGS = sorted(
+    "иями ями ами ого его ому ему ыми ими ать ять ить еть ешь ете ишь ите "
+    "ой ей ий ый ая яя ое ее ые ие ов ев ах ях ом ем ам ям ть ут ют ат ят ет ит "
+    "а я о е ы и у ю ь й".split(),
+    key=len,
+    reverse=True,
+)
+REFLEXIVE = ("ся", "сь")
+# Stems shorter than this are left alone, so short words are not conflated
+MIN_STEM = 3
+
+
+def normalize(text: str) -> str:
+    """Lowercases, folds "ё" to "е" and strips punctuation and extra spaces."""
+    text = text.lower().replace("ё", "е")
+    text = NON_WORD.sub(" ", text)
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def stem(word: str) -> str:
+    """Strips a reflexive suffix and one inflection ending from a word."""
+    for suffix in REFLEXIVE:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[: -len(suffix)]
+            break
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+def stem_phrase(text: str) -> str:
+    return " ".join(stem(word) for word in text.split())
+
+
+def split_translation(translation: str) -> List[str]:
+    """Splits a stored translation into its normalized alternatives."""
+    translation = PARENTHESES.sub(" ", translation)
+    alternatives = (normalize(part) for part in ALTERNATIVES.split(translation))
+    return [alternative for alternative in alternatives if alternative]
+
+
+class AnswerMatcher:
+    """
+    Grades vocabulary answers locally against the stored translation.
+
+    An answer is accepted on a normalized exact match or a match after
+    stripping inflection endings. Answers that do not match it are settled
+    from the verdicts the model already gave for the same word. Anything
+    else, including near misses that may be typos or different words
+    ("молот" for "молоко"), is ambiguous and should be escalated to the
+    model.
+    """
+
+    def __init__(self, learn_confidence: float):
+        self.learn_confidence = learn_confidence
+        self.local = 0
+        self.escalated = 0
+
+    def match(
+        self, answer: str, translation: str, learned: Dict[str, bool]
+    ) -> Optional[bool]:
+        """
+        Checks an answer without calling the model.
+
+        Args:
+            answer: Text the user sent
+            translation: Reference translation stored with the word
+            learned: Earlier model verdicts for this word, keyed by normalized answer
+
+        Returns:
+            True or False if the answer could be settled locally, None otherwise
+        """
+        result = self._match(normalize(answer), translation, learned)
+        if result is None:
+            self.escalated += 1
+        else:
+            self.local += 1
+        return result
+
+    def _match(
+        self, answer: str, translation: str, learned: Dict[str, bool]
+    ) -> Optional[bool]:
+        if not answer:
+            return False
+        # The user's own translation wins over verdicts learned from others
+        if self._matches(answer, split_translation(translation)):
+            return True
+        if answer in learned:
+            return learned[answer]
+        if self._matches(answer, [text for text, correct in learned.items() if correct]):
+            return True
+        return None
+
+    @staticmethod
+    def _matches(answer: str, candidates: List[str]) -> bool:
+        """Whether the answer equals a candidate, as is or after stemming."""
+        if answer in candidates:
+            return True
+        answer_stem = stem_phrase(answer)
+        return any(answer_stem == stem_phrase(candidate) for candidate in candidates)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.local + self.escalated
+        return {
+            "local": self.local,
+            "escalated": self.escalated,
+            "local_rate": round(self.local / total, 3) if total else 0.0,
+        }
+
+
+answer_matcher = AnswerMatcher(
+    learn_confidence=env_float("ANSWER_LEARN_CONFIDENCE", 0.9),
+)
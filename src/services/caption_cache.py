@@ -0,0 +1,149 @@
+# services/caption_cache.py
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from utils.config import env_int, env_path
+from utils.logger import get_logger
+from utils.storage import load_json_file, save_json_file
+
+logger = get_logger(__name__)
+
+# New captions stored between two saves to disk
+SAVE_EVERY = 20
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class CaptionCache:
+    """
+    Bounded LRU cache of image captions.
+
+    Entries are keyed by Telegram's file_unique_id, which is checked before
+    the file is downloaded. Each entry also stores the perceptual hash of
+    the image, so a re-upload of the same picture under a new file id is
+    found by hash (within `max_distance` differing bits). The cache is saved
+    to a JSON file and restored on startup.
+    """
+
+    def __init__(self, path: str, max_entries: int, max_distance: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        # file_unique_id -> (perceptual hash, caption)
+        self._entries: OrderedDict[str, Tuple[Optional[int], str]] = OrderedDict()
+        self._by_hash: Dict[int, str] = {}
+        self._unsaved = 0
+        self._save_task: Optional[asyncio.Task] = None
+        self.file_hits = 0
+        self.hash_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def start(self) -> None:
+        """Restores the saved cache."""
+        for entry in await asyncio.to_thread(load_json_file, self.path):
+            image_hash = entry.get("hash")
+            self._store(
+                entry["file_id"],
+                int(image_hash, 16) if image_hash else None,
+                entry["caption"],
+            )
+        logger.info(f"Caption cache restored with {len(self._entries)} entries")
+
+    async def stop(self) -> None:
+        """Saves the cache to disk."""
+        await self._save()
+
+    def get_by_file(self, file_unique_id: str) -> Optional[str]:
+        """Returns the caption stored for a Telegram file, without downloading it."""
+        entry = self._entries.get(file_unique_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(file_unique_id)
+        self.file_hits += 1
+        return entry[1]
+
+    def get_by_hash(self, image_hash: Optional[int]) -> Optional[str]:
+        """
+        Returns the caption of a perceptually identical image.
+
+        Counts a miss when nothing is found, so call it only after
+        get_by_file() has missed.
+        """
+        file_id = None
+        if image_hash is not None:
+            file_id = self._by_hash.get(image_hash)
+            if file_id is None and self.max_distance:
+                file_id = next(
+                    (
+                        candidate
+                        for known, candidate in self._by_hash.items()
+                        if hamming_distance(known, image_hash) <= self.max_distance
+                    ),
+                    None,
+                )
+
+        if file_id is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(file_id)
+        self.hash_hits += 1
+        return self._entries[file_id][1]
+
+    def set(self, file_unique_id: str, image_hash: Optional[int], caption: str) -> None:
+        """Stores a caption and saves the cache every SAVE_EVERY new entries."""
+        self._store(file_unique_id, image_hash, caption)
+        self._unsaved += 1
+        if self._unsaved >= SAVE_EVERY and not (
+            self._save_task and not self._save_task.done()
+        ):
+            self._save_task = asyncio.create_task(self._save())
+
+    def _store(self, file_unique_id: str, image_hash: Optional[int], caption: str) -> None:
+        if file_unique_id in self._entries:
+            self._remove(file_unique_id)
+        self._entries[file_unique_id] = (image_hash, caption)
+        if image_hash is not None:
+            self._by_hash[image_hash] = file_unique_id
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, file_unique_id: str) -> None:
+        image_hash, _ = self._entries.pop(file_unique_id)
+        if image_hash is not None and self._by_hash.get(image_hash) == file_unique_id:
+            del self._by_hash[image_hash]
+
+    async def _save(self) -> None:
+        self._unsaved = 0
+        data = [
+            {
+                "file_id": file_id,
+                "hash": f"{image_hash:016x}" if image_hash is not None else None,
+                "caption": caption,
+            }
+            for file_id, (image_hash, caption) in self._entries.items()
+        ]
+        await asyncio.to_thread(save_json_file, self.path, data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.file_hits + self.hash_hits + self.misses
+        hits = self.file_hits + self.hash_hits
+        return {
+            "file_hits": self.file_hits,
+            "hash_hits": self.hash_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+caption_cache = CaptionCache(
+    path=env_path("CAPTION_CACHE_FILE", "caption_cache.json"),
+    max_entries=env_int("CAPTION_CACHE_SIZE", 2000),
+    max_distance=env_int("CAPTION_CACHE_MAX_DISTANCE", 4),
+)
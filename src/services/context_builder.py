@@ -0,0 +1,129 @@
+# services/context_builder.py
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+from database.models import Conversation
+from lexicon.prompts import get_summary_context_message
+from services.tokens import (
+    TOKENS_PER_MESSAGE,
+    TOKENS_PER_REPLY,
+    TokenEstimator,
+    create_token_estimator,
+)
+from utils.config import env_int
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Maximum number of stored messages fetched before packing them into the budget
+CONTEXT_HISTORY_LIMIT = env_int("CONTEXT_HISTORY_LIMIT", 50)
+
+
+def canonical_text(text: str) -> str:
+    """Normalizes line endings, Unicode form and surrounding whitespace."""
+    return unicodedata.normalize("NFC", text.replace("\r\n", "\n")).strip()
+
+
+def make_message(role: str, content: str) -> Dict[str, str]:
+    """Builds a message with a fixed key order and canonical content."""
+    return {"role": role, "content": canonical_text(content)}
+
+
+class ContextBuilder:
+    """
+    Packs a system prompt, conversation history and the new user message
+    into a token budget.
+
+    The system prompt and user message are always included. History is
+    added newest first until the next message would exceed the budget.
+    Token counts of stored messages are cached by message id.
+
+    Messages are laid out from most to least static (system prompt, summary,
+    history, new message) and serialized canonically, so consecutive requests
+    share a byte-identical prefix that the upstream prompt cache can reuse.
+    A user message sent in one turn is sent with the same bytes as history
+    in the next.
+    """
+
+    def __init__(self, estimator: TokenEstimator, budget: int, cache_size: int):
+        self.estimator = estimator
+        self.budget = budget
+        self.cache_size = cache_size
+        self._token_cache: OrderedDict[int, int] = OrderedDict()
+
+    def text_tokens(self, text: str) -> int:
+        return self.estimator.count(text) + TOKENS_PER_MESSAGE
+
+    def message_tokens(self, message: Conversation) -> int:
+        """Returns the token count of a stored message, computing it once per id."""
+        if message.id is None:
+            return self.text_tokens(message.content)
+
+        tokens = self._token_cache.get(message.id)
+        if tokens is None:
+            tokens = self.text_tokens(message.content)
+            self._token_cache[message.id] = tokens
+            if len(self._token_cache) > self.cache_size:
+                self._token_cache.popitem(last=False)
+        else:
+            self._token_cache.move_to_end(message.id)
+        return tokens
+
+    def build(
+        self,
+        system_prompt: str,
+        history: Sequence[Conversation],
+        user_message: Optional[str] = None,
+        budget: Optional[int] = None,
+        summary: Optional[str] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Builds the messages list for a chat completion.
+
+        Args:
+            system_prompt: System prompt, always included first
+            history: Stored messages in chronological order
+            user_message: New user message, always included last
+            budget: Prompt token budget, defaults to CONTEXT_TOKEN_BUDGET
+            summary: Running summary of turns older than `history`,
+                included right after the system prompt
+
+        Returns:
+            List of messages in OpenAI format
+        """
+        budget = budget or self.budget
+        summary_message = get_summary_context_message(summary) if summary else None
+        total = TOKENS_PER_REPLY + self.text_tokens(system_prompt)
+        if summary_message:
+            total += self.text_tokens(summary_message)
+        if user_message is not None:
+            total += self.text_tokens(user_message)
+
+        selected: List[Conversation] = []
+        for message in reversed(history):
+            tokens = self.message_tokens(message)
+            if total + tokens > budget:
+                break
+            selected.append(message)
+            total += tokens
+        selected.reverse()
+
+        logger.info(
+            f"Context built: {len(selected)}/{len(history)} history messages, "
+            f"~{total} prompt tokens (budget {budget})"
+        )
+
+        messages = [make_message("system", system_prompt)]
+        if summary_message:
+            messages.append(make_message("system", summary_message))
+        messages.extend(make_message(msg.role, msg.content) for msg in selected)
+        if user_message is not None:
+            messages.append(make_message("user", user_message))
+        return messages
+
+
+context_builder = ContextBuilder(
+    estimator=create_token_estimator(),
+    budget=env_int("CONTEXT_TOKEN_BUDGET", 3000),
+    cache_size=env_int("CONTEXT_TOKEN_CACHE_SIZE", 50_000),
+)
@@ -0,0 +1,330 @@
+# services/conversation_writer.py
+import asyncio
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.crud import get_conversation_history
+from database.database import AsyncSessionLocal
+from database.models import Conversation, User as DbUser
+from utils.config import env_bool, env_int, env_path
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds to wait before retrying after a failed flush
+FLUSH_RETRY_DELAY = 5.0
+
+
+@dataclass
+class PendingMessage:
+    user_id: int
+    role: str
+    content: str
+    conversation_type: str
+    persona: Optional[str]
+    # Set when the message is queued and stored as is, so a flushed row can
+    # be matched with its pending copy
+    timestamp: datetime
+
+    def key(self) -> Tuple[datetime, str]:
+        return utc_naive(self.timestamp), self.role
+
+    def to_model(self) -> Conversation:
+        """A transient row (id is None) for building prompts."""
+        return Conversation(**asdict(self))
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["timestamp"] = self.timestamp.isoformat()
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> "PendingMessage":
+        data = json.loads(line)
+        data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+        return cls(**data)
+
+
+def utc_naive(value: datetime) -> datetime:
+    """Drivers return aware (PostgreSQL) or naive UTC (SQLite) timestamps."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ConversationWriter:
+    """
+    Write-behind queue for conversation messages.
+
+    Handlers only enqueue; a background task inserts the queued rows of all
+    users with multi-row INSERTs every `flush_interval` seconds, or sooner
+    once `batch_size` rows are waiting, and everything left is flushed on
+    shutdown. Queued rows are appended to a spool file first and the file
+    is cleared after they are committed, so a crash loses nothing: the
+    spool is synced to disk before `enqueue` returns (unless `fsync` is
+    off) and replayed on the next start (at-least-once, a crash between the
+    commit and the clear can store a message twice). History reads merge
+    the queued rows of the conversation with the stored ones.
+
+    When the database rejects a batch, its rows are retried one at a time
+    and the ones it still rejects are appended to the dead-letter file, so
+    a single bad row cannot hold up the queue. Other errors (the database
+    being unreachable) keep the rows queued for the next flush.
+    """
+
+    def __init__(
+        self,
+        spool_path: Optional[str],
+        dead_letter_path: Optional[str],
+        flush_interval: float,
+        batch_size: int,
+        fsync: bool = True,
+    ):
+        self.spool_path = spool_path
+        self.dead_letter_path = dead_letter_path
+        self.fsync = fsync
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.enqueued = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self._pending: List[PendingMessage] = []
+        self._spool = None
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Replays messages left in the spool and starts the flush loop."""
+        if self.spool_path and os.path.exists(self.spool_path):
+            with open(self.spool_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._pending.append(PendingMessage.from_json(line))
+            if self._pending:
+                logger.info(f"Recovered {len(self._pending)} spooled conversation messages")
+        if self.spool_path:
+            self._spool = open(self.spool_path, "a", encoding="utf-8")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the flush loop and writes every queued message."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        if self._pending:
+            logger.warning(
+                f"{len(self._pending)} conversation messages left in {self.spool_path}"
+            )
+        if self._spool:
+            self._spool.close()
+            self._spool = None
+
+    def enqueue(
+        self,
+        user: DbUser,
+        role: str,
+        content: str,
+        conversation_type: str,
+        persona: Optional[str] = None,
+    ) -> None:
+        """Queues a conversation message; never touches the database."""
+        message = PendingMessage(
+            user_id=user.id,
+            role=role,
+            content=content,
+            conversation_type=conversation_type,
+            persona=persona,
+            timestamp=datetime.now(timezone.utc),
+        )
+        if self._spool:
+            self._spool.write(message.to_json() + "\n")
+            self._sync(self._spool)
+        self._pending.append(message)
+        self.enqueued += 1
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def get_history(
+        self,
+        db: AsyncSession,
+        user: DbUser,
+        conversation_type: str,
+        limit: int = 10,
+        after_id: Optional[int] = None,
+    ) -> List[Conversation]:
+        """
+        Conversation history including messages that are still queued.
+
+        Args:
+            db: Database session
+            user: Owner of the conversation
+            conversation_type: Conversation to read
+            limit: Maximum number of messages
+            after_id: Only stored messages with a larger id (queued ones are newer)
+
+        Returns:
+            Up to `limit` newest messages, oldest first
+        """
+        stored = await get_conversation_history(db, user, conversation_type, limit, after_id)
+        pending = [
+            m
+            for m in self._pending
+            if m.user_id == user.id and m.conversation_type == conversation_type
+        ]
+        if not pending:
+            return stored
+
+        # A flush may have committed some queued rows before they left the queue
+        seen = {(utc_naive(m.timestamp), m.role) for m in stored if m.timestamp}
+        merged = stored + [m.to_model() for m in pending if m.key() not in seen]
+        return merged[-limit:]
+
+    async def discard(self, user_id: int, conversation_type: str) -> None:
+        """Drops queued messages of a conversation that is being cleared."""
+        async with self._lock:
+            kept = [
+                m
+                for m in self._pending
+                if not (m.user_id == user_id and m.conversation_type == conversation_type)
+            ]
+            if len(kept) != len(self._pending):
+                self._pending = kept
+                self._rewrite_spool()
+
+    async def flush(self) -> None:
+        """Inserts all queued messages in batches of `batch_size`."""
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[: self.batch_size]
+                try:
+                    await self._insert(batch)
+                except (DataError, IntegrityError) as e:
+                    logger.warning(
+                        f"Batch of {len(batch)} conversation messages rejected, "
+                        f"retrying one at a time: {e}"
+                    )
+                    await self._insert_each(batch)
+                    continue
+                # Only flush() removes rows and it holds the lock, so the
+                # batch is still at the head of the queue
+                del self._pending[: len(batch)]
+                self.flushed += len(batch)
+                self.batches += 1
+                self._rewrite_spool()
+
+    async def _insert(self, messages: List[PendingMessage]) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                insert(Conversation),
+                [
+                    {
+                        "user_id": m.user_id,
+                        "role": m.role,
+                        "content": m.content,
+                        "conversation_type": m.conversation_type,
+                        "persona": m.persona,
+                        "timestamp": m.timestamp,
+                    }
+                    for m in messages
+                ],
+            )
+            await db.commit()
+
+    async def _insert_each(self, batch: List[PendingMessage]) -> None:
+        """Inserts a rejected batch row by row, dead-lettering the bad rows."""
+        try:
+            for message in batch:
+                try:
+                    await self._insert([message])
+                    self.flushed += 1
+                    self.batches += 1
+                except (DataError, IntegrityError) as e:
+                    self._dead_letter(message, e)
+                del self._pending[0]
+        finally:
+            self._rewrite_spool()
+
+    def _dead_letter(self, message: PendingMessage, error: Exception) -> None:
+        self.dead_lettered += 1
+        logger.error(
+            f"Dropping conversation message of user {message.user_id} "
+            f"to {self.dead_letter_path}: {error}"
+        )
+        if not self.dead_letter_path:
+            return
+        data = json.loads(message.to_json())
+        data["error"] = str(error).splitlines()[0]
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(data, ensure_ascii=False) + "\n")
+            self._sync(f)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Error flushing conversation messages: {e}")
+                await asyncio.sleep(FLUSH_RETRY_DELAY)
+
+    def _sync(self, f) -> None:
+        """Writes a file's buffer out and, with `fsync`, to the disk."""
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _rewrite_spool(self) -> None:
+        """Makes the spool hold exactly the queued messages."""
+        if not self._spool:
+            return
+        if not self._pending:
+            self._spool.truncate(0)
+            return
+        self._spool.close()
+        temp_path = f"{self.spool_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(m.to_json() + "\n" for m in self._pending)
+            self._sync(f)
+        os.replace(temp_path, self.spool_path)
+        self._spool = open(self.spool_path, "a", encoding="utf-8")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "rows_per_batch": round(self.flushed / self.batches, 1) if self.batches else 0.0,
+            "failures": self.failures,
+            "dead_lettered": self.dead_lettered,
+            "pending": len(self._pending),
+        }
+
+
+conversation_writer = ConversationWriter(
+    spool_path=env_path("CONVERSATION_SPOOL_FILE", "conversation_spool.jsonl"),
+    dead_letter_path=env_path(
+        "CONVERSATION_DEAD_LETTER_FILE", "conversation_dead_letter.jsonl"
+    ),
+    flush_interval=env_int("CONVERSATION_FLUSH_MS", 200) / 1000,
+    batch_size=env_int("CONVERSATION_BATCH_SIZE", 100),
+    fsync=env_bool("CONVERSATION_SPOOL_FSYNC", True),
+)
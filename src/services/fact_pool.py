@@ -0,0 +1,138 @@
+# services/fact_pool.py
+import asyncio
+import re
+from collections import deque
+from typing import Optional
+from services.openai_client import openai_client
+from services.rate_limiter import current_user_id
+from lexicon.prompts import get_random_facts_batch_prompt
+from utils.config import env_int, env_path
+from utils.logger import get_logger
+from utils.storage import load_json_file, save_json_file
+
+logger = get_logger(__name__)
+
+# Leading "1.", "2)", "-", "*" or "•" the model may add despite the prompt
+LIST_MARKER = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+# Seconds to wait before retrying after a failed refill
+REFILL_RETRY_DELAY = 30.0
+# Number of recently served facts remembered to avoid repeating them
+SERVED_HISTORY = 500
+
+
+class FactPool:
+    """
+    Buffer of pre-generated random facts.
+
+    Facts are generated several per LLM call by a background task whenever
+    the buffer drops below `low_water`, so serving a fact never waits for
+    OpenAI. The buffer is saved to a JSON file and restored on startup.
+    """
+
+    def __init__(self, path: str, size: int, low_water: int, batch_size: int):
+        self.path = path
+        self.size = size
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self._facts: deque[str] = deque()
+        self._served: deque[str] = deque(maxlen=SERVED_HISTORY)
+        self._refill_task: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._facts)
+
+    async def start(self) -> None:
+        """Restores the saved buffer and starts filling it if needed."""
+        facts = await asyncio.to_thread(load_json_file, self.path)
+        self._facts.extend(fact for fact in facts if isinstance(fact, str))
+        logger.info(f"Fact pool restored with {len(self._facts)} facts")
+        self._schedule_refill()
+
+    async def stop(self) -> None:
+        """Stops the background refill and saves the buffer."""
+        if self._refill_task and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+        await self._save()
+
+    def get_fact(self) -> Optional[str]:
+        """
+        Takes a fact from the buffer without any network call.
+
+        Returns:
+            A fact, or None if the buffer is empty (e.g. on a cold start)
+        """
+        fact = self._facts.popleft() if self._facts else None
+        if fact:
+            self._served.append(fact)
+        if len(self._facts) < self.low_water:
+            self._schedule_refill()
+        return fact
+
+    def _schedule_refill(self) -> None:
+        if self._refill_task and not self._refill_task.done():
+            return
+        if len(self._facts) >= self.size:
+            return
+        if asyncio.get_running_loop().time() < self._retry_at:
+            return
+        self._refill_task = asyncio.create_task(self._refill())
+
+    def _parse(self, response: str) -> list[str]:
+        """Splits a batch response into new, unique facts."""
+        known = set(self._facts) | set(self._served)
+        facts = []
+        for line in response.splitlines():
+            fact = LIST_MARKER.sub("", line).strip()
+            if fact and fact not in known:
+                known.add(fact)
+                facts.append(fact)
+        return facts
+
+    async def _refill(self) -> None:
+        """Generates facts in batches until the buffer is full."""
+        # The task inherits the context of the handler that scheduled it;
+        # queue its requests as background work rather than as that user's.
+        current_user_id.set(None)
+        try:
+            while len(self._facts) < self.size:
+                response = await openai_client.complete(
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": get_random_facts_batch_prompt(self.batch_size),
+                        }
+                    ],
+                    model="gpt-4o-mini",
+                    max_tokens=100 * self.batch_size,
+                    temperature=1.0,
+                    label="Random facts batch",
+                    feature="random",
+                )
+                facts = self._parse(response or "")
+                if not facts:
+                    logger.warning("Random facts batch contained no new facts")
+                    break
+                self._facts.extend(facts)
+                logger.info(f"Fact pool refilled: {len(self._facts)} facts buffered")
+            await self._save()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error refilling fact pool: {e}")
+            self._retry_at = asyncio.get_running_loop().time() + REFILL_RETRY_DELAY
+
+    async def _save(self) -> None:
+        await asyncio.to_thread(save_json_file, self.path, list(self._facts))
+
+
+fact_pool = FactPool(
+    path=env_path("FACT_POOL_FILE", "fact_pool.json"),
+    size=env_int("FACT_POOL_SIZE", 30),
+    low_water=env_int("FACT_POOL_LOW_WATER", 10),
+    batch_size=env_int("FACT_POOL_BATCH_SIZE", 10),
+)
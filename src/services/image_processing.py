@@ -0,0 +1,132 @@
+# services/image_processing.py
+import asyncio
+import io
+from dataclasses import dataclass
+from typing import Optional, Sequence
+from aiogram.types import PhotoSize
+from PIL import Image, ImageOps, UnidentifiedImageError
+from utils.config import env_int, env_str
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Longest side an image is scaled down to before it is sent
+IMAGE_MAX_SIDE = env_int("IMAGE_MAX_SIDE", 1024)
+IMAGE_JPEG_QUALITY = env_int("IMAGE_JPEG_QUALITY", 85)
+# Vision detail level: "low", "high" or "auto" to choose by image size
+IMAGE_DETAIL = env_str("IMAGE_DETAIL", "auto")
+# At or below this size "low" detail (one 512px tile) loses nothing
+LOW_DETAIL_SIDE = 512
+# Side of the grid compared by the perceptual hash (64 bits)
+HASH_SIZE = 8
+
+
+@dataclass
+class PreparedImage:
+    """Image bytes ready to be sent to the vision API."""
+
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    # "low", "high", or "auto" to let the API decide
+    detail: str
+    # Perceptual hash of the picture, None if it could not be decoded
+    phash: Optional[int] = None
+
+
+def pick_photo_size(
+    sizes: Sequence[PhotoSize], target: int = IMAGE_MAX_SIDE
+) -> PhotoSize:
+    """
+    Picks the smallest Telegram photo size whose longest side reaches `target`.
+
+    Falls back to the largest size if none is big enough.
+    """
+    ordered = sorted(sizes, key=lambda size: max(size.width, size.height))
+    for size in ordered:
+        if max(size.width, size.height) >= target:
+            return size
+    return ordered[-1]
+
+
+def choose_detail(width: int, height: int, detail: str = IMAGE_DETAIL) -> str:
+    """Returns the vision detail level for an image of the given size."""
+    if detail in ("low", "high"):
+        return detail
+    return "low" if max(width, height) <= LOW_DETAIL_SIDE else "high"
+
+
+def dhash(image: Image.Image, size: int = HASH_SIZE) -> int:
+    """
+    Difference hash: one bit per horizontally adjacent pixel pair of a
+    downscaled grayscale copy. Survives re-encoding and rescaling.
+    """
+    pixels = list(
+        image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS).getdata()
+    )
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def prepare_image(
+    data: bytes,
+    mime_type: str = "image/jpeg",
+    max_side: int = IMAGE_MAX_SIDE,
+    quality: int = IMAGE_JPEG_QUALITY,
+) -> PreparedImage:
+    """
+    Downscales an image and re-encodes it as a JPEG without metadata.
+
+    The EXIF orientation is applied before it is dropped. Images Pillow cannot
+    decode are passed through unchanged.
+
+    Args:
+        data: Original image bytes
+        mime_type: MIME type reported by Telegram
+        max_side: Longest side of the result in pixels
+        quality: JPEG quality of the result
+
+    Returns:
+        The prepared image, its perceptual hash and the detail level to request
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, "white")
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            phash = dhash(image)
+
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=quality, optimize=True)
+            width, height = image.size
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning(f"Could not re-encode image, sending it unchanged: {e}")
+        return PreparedImage(data, mime_type, 0, 0, "auto")
+
+    prepared = output.getvalue()
+    logger.info(
+        f"Image prepared: {len(data)} -> {len(prepared)} bytes, {width}x{height}"
+    )
+    return PreparedImage(
+        prepared, "image/jpeg", width, height, choose_detail(width, height), phash
+    )
+
+
+async def prepare_image_async(
+    data: bytes, mime_type: Optional[str] = None
+) -> PreparedImage:
+    """Runs prepare_image in a worker thread so decoding never blocks the event loop."""
+    return await asyncio.to_thread(prepare_image, data, mime_type or "image/jpeg")
@@ -1,27 +1,381 @@
 # services/openai_client.py
+import asyncio
 import base64
+import importlib.util
+import json
+import math
+from dataclasses import asdict, dataclass
 from os import getenv
+import httpx
 import openai
-from typing import Optional, List, Dict
+from typing import Any, AsyncIterator, Optional, List, Dict, Tuple
+from services.rate_limiter import RateLimiter
+from services.resilience import (
+    CircuitOpenError,
+    Resilience,
+    upstream_request,
+    upstream_time_left,
+)
+from services.response_cache import ResponseCache, make_cache_key
+from services.single_flight import SingleFlight
+from services.tokens import estimate_messages_tokens
+from services.usage_stats import UsageStats
+from utils.config import env_bool, env_float, env_int
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# "True" and "False" are single tokens, so one output token holds the verdict
+JUDGE_MAX_TOKENS = 1
+# Alternatives returned for the verdict token, used to compute the confidence
+JUDGE_TOP_LOGPROBS = 5
+# Answer tokens accepted as a verdict
+VERDICT_TOKENS = {"true": True, "yes": True, "false": False, "no": False}
+
+
+@dataclass(frozen=True)
+class Verdict:
+    """
+    Result of a yes/no judgment.
+
+    `confidence` is the probability the model gave to the returned answer,
+    normalized over the positive and negative tokens (1.0 when logprobs are
+    not available).
+    """
+
+    value: bool
+    confidence: float
+
+
+def parse_verdict(text: str) -> Optional[bool]:
+    """Maps a model answer such as "True", " false." or "Yes" to a boolean."""
+    return VERDICT_TOKENS.get(text.strip().strip(".!'\"").lower())
+
+
+def build_http_client() -> httpx.AsyncClient:
+    """
+    Builds the shared keep-alive connection pool used for all OpenAI requests.
+
+    Environment variables:
+        OPENAI_MAX_CONNECTIONS: Maximum number of open connections (default 100)
+        OPENAI_MAX_KEEPALIVE: Idle connections kept for reuse (default 20)
+        OPENAI_KEEPALIVE_EXPIRY: Seconds an idle connection is kept (default 30)
+        OPENAI_TIMEOUT: Overall read/write timeout in seconds (default 60)
+        OPENAI_CONNECT_TIMEOUT: Connect timeout in seconds (default 5)
+        OPENAI_HTTP2: Enable HTTP/2, requires the `h2` package (default false)
+    """
+    limits = httpx.Limits(
+        max_connections=env_int("OPENAI_MAX_CONNECTIONS", 100),
+        max_keepalive_connections=env_int("OPENAI_MAX_KEEPALIVE", 20),
+        keepalive_expiry=env_float("OPENAI_KEEPALIVE_EXPIRY", 30.0),
+    )
+    timeout = httpx.Timeout(
+        env_float("OPENAI_TIMEOUT", 60.0),
+        connect=env_float("OPENAI_CONNECT_TIMEOUT", 5.0),
+    )
+
+    http2 = env_bool("OPENAI_HTTP2", False)
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("OPENAI_HTTP2 is enabled but 'h2' is not installed, using HTTP/1.1")
+        http2 = False
+
+    logger.info(
+        f"OpenAI HTTP pool: max_connections={limits.max_connections}, "
+        f"keepalive={limits.max_keepalive_connections}, http2={http2}"
+    )
+    return openai.DefaultAsyncHttpxClient(limits=limits, timeout=timeout, http2=http2)
+
+
+def clamp_timeout(timeout: httpx.Timeout, limit: float) -> httpx.Timeout:
+    """The timeout with every phase capped at `limit` seconds."""
+
+    def cap(value: Optional[float]) -> float:
+        return limit if value is None else min(value, limit)
+
+    return httpx.Timeout(
+        connect=cap(timeout.connect),
+        read=cap(timeout.read),
+        write=cap(timeout.write),
+        pool=cap(timeout.pool),
+    )
+
 
 class OpenAIClient:
     """
-    OpenAI API client for ChatGPT integration.
+    Asynchronous OpenAI API client for ChatGPT integration.
+
+    All requests go through a single shared httpx connection pool, so calls
+    never block the event loop and connections are reused between handlers.
     """
 
-    def __init__(self):
-        """Initialize OpenAI client with API key from environment."""
-        api_key = getenv("OPENAI_API_KEY")
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        base_url: Optional[str] = None,
+    ):
+        """
+        Initialize OpenAI client.
+
+        Args:
+            api_key: OpenAI API key, defaults to OPENAI_API_KEY from environment
+            http_client: Preconfigured httpx client, defaults to build_http_client()
+            base_url: API base URL, defaults to OPENAI_BASE_URL from environment
+                or the official endpoint; point it at benchmarks.fake_openai
+                for load tests
+        """
+        api_key = api_key or getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY is not set in environment variables")
 
-        self.client = openai.OpenAI(api_key=api_key)
+        self.http_client = http_client or build_http_client()
+        # 429s are handled by the rate limiter instead of the SDK's own retries
+        base_url = base_url or getenv("OPENAI_BASE_URL") or None
+        if base_url:
+            logger.info(f"Using OpenAI base URL {base_url}")
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=self.http_client,
+            max_retries=0,
+        )
+        self.rate_limiter = RateLimiter()
+        self.rate_limit_retries = env_int("OPENAI_RATE_LIMIT_RETRIES", 5)
+        self.cache = ResponseCache(
+            max_bytes=env_int("OPENAI_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+            default_ttl=env_float("OPENAI_CACHE_TTL", 3600.0),
+        )
+        self.single_flight = SingleFlight()
+        self.resilience = Resilience()
+        self.usage = UsageStats()
         logger.info("OpenAI client initialized successfully")
 
+    async def close(self) -> None:
+        """Close the shared connection pool."""
+        await self.client.close()
+        logger.info("OpenAI client closed")
+
+    async def _send(
+        self, messages: List[Dict], model: str, max_tokens: int, **params
+    ) -> Tuple[Any, int]:
+        """
+        Create a completion once the model's rate limiter lets it through.
+
+        On a 429 the model's scheduler is paused until the reset time reported
+        by the server and the request is queued again, up to
+        OPENAI_RATE_LIMIT_RETRIES times.
+
+        Under a resilience policy the HTTP timeout is capped below the time
+        left before the deadline, so a hung upstream fails as a timeout of
+        the request itself; a deadline that passes while queued raises
+        asyncio.TimeoutError without sending anything.
+
+        Returns:
+            Parsed response (or stream) and the estimated token cost
+        """
+        limiter = self.rate_limiter.for_model(model)
+        estimated = estimate_messages_tokens(messages) + max_tokens
+
+        for attempt in range(self.rate_limit_retries + 1):
+            await limiter.acquire(estimated)
+            time_left = upstream_time_left()
+            if time_left is not None:
+                if time_left <= 0:
+                    raise asyncio.TimeoutError
+                params["timeout"] = clamp_timeout(self.http_client.timeout, time_left)
+            try:
+                with upstream_request():
+                    raw = await self.client.chat.completions.with_raw_response.create(
+                        model=model, messages=messages, max_tokens=max_tokens, **params
+                    )
+            except openai.RateLimitError as e:
+                delay = limiter.pause(e.response.headers)
+                if attempt == self.rate_limit_retries:
+                    raise
+                logger.warning(
+                    f"OpenAI rate limit hit for {model}, queued again for {delay:.1f}s"
+                )
+                continue
+
+            limiter.update_from_headers(raw.headers)
+            return raw.parse(), estimated
+
+    async def _request(
+        self,
+        messages: List[Dict],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        label: str,
+        feature: str,
+    ) -> Optional[str]:
+        """Send a single chat completion request and log token usage."""
+        response, estimated = await self._send(
+            messages, model, max_tokens, temperature=temperature
+        )
+
+        self._record_usage(response.usage, model, estimated, label, feature)
+        return response.choices[0].message.content
+
+    def _record_usage(
+        self, usage: Any, model: str, estimated: int, label: str, feature: str
+    ) -> None:
+        """Settle the rate limiter with the actual token usage and log it."""
+        if usage:
+            self.rate_limiter.for_model(model).settle(estimated, usage.total_tokens)
+            cached = self.usage.record(feature, usage)
+            logger.info(
+                f"{label} received: tokens_used={usage.total_tokens}, "
+                f"cached_prompt_tokens={cached}"
+            )
+        else:
+            logger.info(f"{label} received: token usage not available in response.")
+
+    async def _judge_request(
+        self, messages: List[Dict], model: str, label: str, feature: str
+    ) -> Optional[Verdict]:
+        """Ask for a single-token verdict and derive its confidence from logprobs."""
+        response, estimated = await self._send(
+            messages,
+            model,
+            JUDGE_MAX_TOKENS,
+            temperature=0.0,
+            logprobs=True,
+            top_logprobs=JUDGE_TOP_LOGPROBS,
+        )
+        self._record_usage(response.usage, model, estimated, label, feature)
+
+        choice = response.choices[0]
+        value = parse_verdict(choice.message.content or "")
+        if value is None:
+            logger.warning(f"{label}: unexpected verdict {choice.message.content!r}")
+            return None
+
+        confidence = 1.0
+        if choice.logprobs and choice.logprobs.content:
+            first = choice.logprobs.content[0]
+            probabilities = {True: 0.0, False: 0.0}
+            for candidate in first.top_logprobs or [first]:
+                side = parse_verdict(candidate.token)
+                if side is not None:
+                    probabilities[side] += math.exp(candidate.logprob)
+            total = probabilities[True] + probabilities[False]
+            if total:
+                confidence = probabilities[value] / total
+
+        return Verdict(value=value, confidence=round(confidence, 4))
+
+    async def complete(
+        self,
+        messages: List[Dict],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        label: str = "OpenAI response",
+        cache: bool = False,
+        cache_ttl: Optional[float] = None,
+        coalesce: Optional[bool] = None,
+        feature: str = "default",
+    ) -> Optional[str]:
+        """
+        Send a chat completion request.
+
+        With `cache` enabled, the response is looked up in and stored to the
+        response cache. Only successful responses are cached.
+
+        With `coalesce` enabled (the default for cacheable calls), concurrent
+        identical requests share one upstream call.
+
+        The upstream call runs under the resilience policy of `feature`
+        (deadline, retries with backoff, hedging and circuit breaker).
+
+        Unlike the get_* methods, errors are not turned into user-facing
+        text: any openai exception is raised to the caller.
+        """
+        if coalesce is None:
+            coalesce = cache
+
+        async def request() -> Optional[str]:
+            return await self.resilience.call(
+                feature,
+                lambda: self._request(
+                    messages, model, max_tokens, temperature, label, feature
+                ),
+            )
+
+        if not (cache or coalesce):
+            return await request()
+
+        key = make_cache_key(
+            model, messages, max_tokens=max_tokens, temperature=temperature
+        )
+        if cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info(f"{label} served from cache")
+                return cached
+
+        async def call() -> Optional[str]:
+            content = await request()
+            if cache and content:
+                self.cache.set(key, content, ttl=cache_ttl)
+            return content
+
+        if coalesce:
+            return await self.single_flight.do(key, call)
+        return await call()
+
+    async def judge(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "gpt-4o-mini",
+        cache: bool = True,
+        cache_ttl: Optional[float] = None,
+        feature: str = "default",
+        label: str = "Judgment",
+    ) -> Optional[Verdict]:
+        """
+        Get a True/False judgment, e.g. whether an answer is correct.
+
+        The request uses greedy sampling and a one-token output cap, so the
+        prompt must ask for a bare "True" or "False". Identical judgments are
+        served from the response cache and concurrent ones are coalesced.
+
+        Args:
+            messages: List of messages in OpenAI format
+            model: OpenAI model to use
+            cache: Serve identical judgments from the response cache
+            cache_ttl: Cache entry lifetime in seconds, defaults to OPENAI_CACHE_TTL
+            feature: Resilience policy to apply, e.g. "quiz"
+            label: Name used in log messages
+
+        Returns:
+            Verdict with its confidence, or None if the request failed or the
+            model did not answer with a verdict
+        """
+        key = make_cache_key(
+            model, messages, max_tokens=JUDGE_MAX_TOKENS, temperature=0.0, judge=True
+        )
+        if cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info(f"{label} served from cache")
+                return Verdict(**json.loads(cached))
+
+        async def call() -> Optional[Verdict]:
+            verdict = await self.resilience.call(
+                feature, lambda: self._judge_request(messages, model, label, feature)
+            )
+            if cache and verdict:
+                self.cache.set(key, json.dumps(asdict(verdict)), ttl=cache_ttl)
+            return verdict
+
+        try:
+            return await self.single_flight.do(key, call)
+        except Exception as e:
+            logger.error(f"Error in judgment request: {e!r}")
+            return None
+
     async def get_response(
         self,
         user_message: str,
@@ -29,6 +383,10 @@ class OpenAIClient:
         model: str = "gpt-4o-mini",
         max_tokens: int = 1000,
         temperature: float = 0.7,
+        cache: bool = False,
+        cache_ttl: Optional[float] = None,
+        coalesce: Optional[bool] = None,
+        feature: str = "default",
     ) -> Optional[str]:
         """
         Get response from ChatGPT.
@@ -39,6 +397,11 @@ class OpenAIClient:
             model: OpenAI model to use
             max_tokens: Maximum tokens in response
             temperature: Response creativity (0.0-1.0)
+            cache: Serve identical requests from the response cache
+            cache_ttl: Cache entry lifetime in seconds, defaults to OPENAI_CACHE_TTL
+            coalesce: Share one upstream call between concurrent identical
+                requests, defaults to the value of `cache`
+            feature: Resilience policy to apply, e.g. "translate"
 
         Returns:
             ChatGPT response text or None if error occurred
@@ -55,42 +418,40 @@ class OpenAIClient:
                 f"Sending request to OpenAI: model={model}, tokens={max_tokens}"
             )
 
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
+            return await self.complete(
+                messages,
+                model,
+                max_tokens,
+                temperature,
+                cache=cache,
+                cache_ttl=cache_ttl,
+                coalesce=coalesce,
+                feature=feature,
             )
 
-            content = response.choices[0].message.content
-            usage = response.usage
+        except CircuitOpenError:
+            logger.error("OpenAI circuit breaker is open, request rejected")
+            return None
 
-            if usage:
-                logger.info(
-                    f"OpenAI response received: tokens_used={usage.total_tokens}"
-                )
-            else:
-                logger.info(
-                    "OpenAI response received: token usage not available in response."
-                )
-
-            return content
+        except asyncio.TimeoutError:
+            logger.error("OpenAI request exceeded its deadline")
+            return None
 
         except openai.RateLimitError:
-            logger.error("OpenAI rate limit exceeded")
-            return "Rate limit exceeded. Please try again later."
+            logger.error("OpenAI rate limit exceeded after queueing")
+            return None
 
         except openai.AuthenticationError:
             logger.error("OpenAI authentication failed")
-            return "Authentication error. Please check API key."
+            return None
 
         except openai.APIError as e:
             logger.error(f"OpenAI API error: {e}")
-            return "API error occurred. Please try again."
+            return None
 
         except Exception as e:
             logger.error(f"Unexpected error in OpenAI request: {e}")
-            return "An unexpected error occurred. Please try again."
+            return None
 
     async def get_conversation_response(
         self,
@@ -98,6 +459,10 @@ class OpenAIClient:
         model: str = "gpt-4o-mini",
         max_tokens: int = 1000,
         temperature: float = 0.7,
+        cache: bool = False,
+        cache_ttl: Optional[float] = None,
+        coalesce: Optional[bool] = None,
+        feature: str = "default",
     ) -> Optional[str]:
         """
         Get response for a conversation with message history.
@@ -107,6 +472,11 @@ class OpenAIClient:
             model: OpenAI model to use
             max_tokens: Maximum tokens in response
             temperature: Response creativity
+            cache: Serve identical requests from the response cache
+            cache_ttl: Cache entry lifetime in seconds, defaults to OPENAI_CACHE_TTL
+            coalesce: Share one upstream call between concurrent identical
+                requests, defaults to the value of `cache`
+            feature: Resilience policy to apply, e.g. "translate"
 
         Returns:
             ChatGPT response text or None if error occurred
@@ -114,30 +484,74 @@ class OpenAIClient:
         try:
             logger.info(f"Sending conversation to OpenAI: {len(messages)} messages")
 
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
+            return await self.complete(
+                messages,
+                model,
+                max_tokens,
+                temperature,
+                cache=cache,
+                cache_ttl=cache_ttl,
+                coalesce=coalesce,
+                feature=feature,
             )
 
-            content = response.choices[0].message.content
-            usage = response.usage
+        except Exception as e:
+            logger.error(f"Error in conversation request: {e!r}")
+            return None
 
-            if usage:
-                logger.info(
-                    f"OpenAI response received: tokens_used={usage.total_tokens}"
-                )
-            else:
-                logger.info(
-                    "OpenAI response received: token usage not available in response."
-                )
+    async def stream_conversation_response(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "gpt-4o-mini",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        feature: str = "default",
+    ) -> AsyncIterator[str]:
+        """
+        Stream a conversation response as it is generated.
 
-            return content
+        Args:
+            messages: List of messages in OpenAI format [{"role": "...", "content": "..."}]
+            model: OpenAI model to use
+            max_tokens: Maximum tokens in response
+            temperature: Response creativity
+            feature: Resilience policy to apply to opening the stream; once
+                text has been yielded the request is never retried
+
+        Yields:
+            Text deltas in the order they arrive
+
+        Raises:
+            openai.OpenAIError: If the request fails, so the caller can replace
+                any partially shown text with an error message
+        """
+        logger.info(f"Streaming conversation from OpenAI: {len(messages)} messages")
+
+        try:
+            stream, estimated = await self.resilience.call(
+                feature,
+                lambda: self._send(
+                    messages,
+                    model,
+                    max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ),
+                hedge=False,
+            )
+
+            async for chunk in stream:
+                if chunk.usage:
+                    self._record_usage(
+                        chunk.usage, model, estimated, "OpenAI stream", feature
+                    )
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
 
         except Exception as e:
-            logger.error(f"Error in conversation request: {e}")
-            return "Error occurred during conversation. Please try again."
+            logger.error(f"Error in streaming conversation request: {e}")
+            raise
 
     async def describe_image(
         self,
@@ -146,52 +560,55 @@ class OpenAIClient:
         model: str = "gpt-4o-mini",
         max_tokens: int = 300,
         temperature: float = 0.7,
+        feature: str = "image",
+        mime_type: str = "image/jpeg",
+        detail: str = "auto",
     ) -> Optional[str]:
         """
         Describe an image using ChatGPT with vision capabilities.
+
+        Args:
+            image_bytes: Encoded image, ideally prepared by prepare_image()
+            prompt: Instruction sent along with the image
+            mime_type: MIME type of `image_bytes`
+            detail: Vision detail level, "low", "high" or "auto"
         """
         try:
-            logger.info("Sending image to OpenAI for description")
+            logger.info(
+                f"Sending image to OpenAI for description: "
+                f"{len(image_bytes)} bytes, detail={detail}"
+            )
 
             base64_image = base64.b64encode(image_bytes).decode("utf-8")
 
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                },
+            messages = [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{mime_type};base64,{base64_image}",
+                                "detail": detail,
                             },
-                        ],
-                    }
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature,
+                        },
+                    ],
+                }
+            ]
+
+            return await self.complete(
+                messages,
+                model,
+                max_tokens,
+                temperature,
+                label="Image description",
+                feature=feature,
             )
 
-            content = response.choices[0].message.content
-            usage = response.usage
-
-            if usage:
-                logger.info(
-                    f"Image description received: tokens_used={usage.total_tokens}"
-                )
-            else:
-                logger.info(
-                    "Image description received: token usage not available in response."
-                )
-
-            return content
-
         except Exception as e:
-            logger.error(f"Error in image description request: {e}")
-            return "Error occurred during image description. Please try again."
+            logger.error(f"Error in image description request: {e!r}")
+            return None
 
 
 # Global client instance
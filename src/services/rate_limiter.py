@@ -0,0 +1,233 @@
+# services/rate_limiter.py
+import asyncio
+import re
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Mapping, Optional, Tuple
+from utils.config import env_int, env_str
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Telegram id of the user the current request is made for, set by UserDataMiddleware.
+# Requests without a user (background jobs) share one queue.
+current_user_id: ContextVar[Optional[int]] = ContextVar("current_user_id", default=None)
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parses OpenAI reset durations such as '20ms', '1s' or '6m0s' into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Token bucket that refills `capacity` units per minute."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.available = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(
+            self.capacity,
+            self.available + (now - self._updated) * self.capacity / 60.0,
+        )
+        self._updated = now
+
+    def wait_time(self, amount: int) -> float:
+        """Seconds until `amount` units are available (capped at the capacity)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing * 60.0 / self.capacity)
+
+    def consume(self, amount: int) -> None:
+        self._refill()
+        self.available -= amount
+
+    def recalibrate(self, limit: Optional[int], remaining: Optional[int]) -> None:
+        """Adopts the limit reported by the server and never assumes more than it has left."""
+        self._refill()
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.available = min(self.available, float(remaining))
+
+
+class ModelRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute scheduler for one model.
+
+    Requests wait in per-user queues that are served round-robin, so one
+    busy user cannot starve the others. A request is released once both
+    buckets can pay for it.
+    """
+
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._queues: OrderedDict[Any, Deque[Tuple[int, asyncio.Future]]] = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self.waited = 0
+        self.throttled = 0
+
+    async def acquire(self, tokens: int) -> None:
+        """Waits for this request's turn and for enough RPM/TPM budget."""
+        if not self._queues and self._wait_time(tokens) == 0:
+            self._consume(tokens)
+            return
+
+        user_key = current_user_id.get()
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user_key, deque()).append((tokens, future))
+        self.waited += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    def _wait_time(self, tokens: int) -> float:
+        return max(
+            self.requests.wait_time(1),
+            self.tokens.wait_time(tokens),
+            self._paused_until - time.monotonic(),
+        )
+
+    def _consume(self, tokens: int) -> None:
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+
+    async def _dispatch(self) -> None:
+        """Releases queued requests one user at a time as budget becomes available."""
+        while self._queues:
+            user_key, queue = next(iter(self._queues.items()))
+            tokens, future = queue[0]
+
+            if not future.done():
+                wait = self._wait_time(tokens)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                self._consume(tokens)
+                future.set_result(None)
+
+            queue.popleft()
+            if queue:
+                self._queues.move_to_end(user_key)
+            else:
+                del self._queues[user_key]
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Charges or refunds the difference between the estimate and real usage."""
+        self.tokens.consume(actual - estimated)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Recalibrates the buckets from x-ratelimit-* response headers."""
+
+        def header_int(name: str) -> Optional[int]:
+            try:
+                return int(headers.get(name, ""))
+            except ValueError:
+                return None
+
+        self.requests.recalibrate(
+            header_int("x-ratelimit-limit-requests"),
+            header_int("x-ratelimit-remaining-requests"),
+        )
+        self.tokens.recalibrate(
+            header_int("x-ratelimit-limit-tokens"),
+            header_int("x-ratelimit-remaining-tokens"),
+        )
+
+    def pause(self, headers: Mapping[str, str]) -> float:
+        """
+        Stops releasing requests after a 429 until the server's reset time.
+
+        Returns:
+            Seconds until requests are released again
+        """
+        self.throttled += 1
+        retry_after_ms = parse_duration(headers.get("retry-after-ms"))
+        resets = [
+            parse_duration(headers.get("x-ratelimit-reset-requests")),
+            parse_duration(headers.get("x-ratelimit-reset-tokens")),
+        ]
+        if retry_after_ms:
+            delay = retry_after_ms / 1000
+        else:
+            delay = (
+                parse_duration(headers.get("retry-after"))
+                or min((reset for reset in resets if reset), default=None)
+                or 1.0
+            )
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "waited": self.waited,
+            "throttled": self.throttled,
+        }
+
+
+def parse_model_limits(value: Optional[str]) -> Dict[str, Tuple[int, int]]:
+    """Parses 'model=rpm/tpm,model=rpm/tpm' into a dictionary."""
+    limits = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        model, _, budget = item.partition("=")
+        try:
+            rpm, tpm = (int(part) for part in budget.split("/"))
+        except ValueError:
+            logger.warning(f"Invalid rate limit entry: {item!r}")
+            continue
+        limits[model.strip()] = (rpm, tpm)
+    return limits
+
+
+class RateLimiter:
+    """
+    Per-model RPM/TPM schedulers.
+
+    Environment variables:
+        OPENAI_RPM: Default requests per minute (default 500)
+        OPENAI_TPM: Default tokens per minute (default 200000)
+        OPENAI_MODEL_LIMITS: Per-model overrides, e.g. "gpt-4o=500/30000"
+    """
+
+    def __init__(self):
+        self.default_rpm = env_int("OPENAI_RPM", 500)
+        self.default_tpm = env_int("OPENAI_TPM", 200_000)
+        self.model_limits = parse_model_limits(env_str("OPENAI_MODEL_LIMITS"))
+        self._limiters: Dict[str, ModelRateLimiter] = {}
+
+    def for_model(self, model: str) -> ModelRateLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            rpm, tpm = self.model_limits.get(
+                model, (self.default_rpm, self.default_tpm)
+            )
+            limiter = ModelRateLimiter(model, rpm, tpm)
+            self._limiters[model] = limiter
+        return limiter
+
+    def stats(self) -> Dict[str, Any]:
+        return {model: limiter.stats() for model, limiter in self._limiters.items()}
@@ -0,0 +1,347 @@
+# services/resilience.py
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields, replace
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, TypeVar
+import openai
+from utils.config import env_bool, env_float, env_int
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Errors worth another attempt: the upstream is slow, unreachable or failing
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+# Number of recent latencies used to estimate the p95
+LATENCY_WINDOW = 200
+# Hedging starts only once this many latencies have been observed
+HEDGE_MIN_SAMPLES = 20
+# Seconds an upstream request's timeout is kept below the remaining deadline,
+# so a hung request fails as an upstream timeout before the deadline does
+UPSTREAM_TIMEOUT_MARGIN = 0.1
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling OpenAI while the circuit breaker is open."""
+
+
+@dataclass
+class Attempt:
+    """One attempt of Resilience.call, seen by the code sending its requests."""
+
+    # Event loop time at which the call's deadline passes
+    deadline: float
+    # Requests sent upstream and not answered; the deadline cancelling a
+    # request leaves it counted
+    pending: int = 0
+
+
+current_attempt: ContextVar[Optional[Attempt]] = ContextVar("current_attempt", default=None)
+
+
+def upstream_time_left() -> Optional[float]:
+    """
+    Seconds an upstream request may take before the call's deadline.
+
+    Returns:
+        None outside Resilience.call
+    """
+    attempt = current_attempt.get()
+    if attempt is None:
+        return None
+    return attempt.deadline - asyncio.get_running_loop().time() - UPSTREAM_TIMEOUT_MARGIN
+
+
+@contextmanager
+def upstream_request() -> Iterator[None]:
+    """Marks the wrapped code as waiting on OpenAI rather than on a queue."""
+    attempt = current_attempt.get()
+    if attempt is None:
+        yield
+        return
+    attempt.pending += 1
+    try:
+        yield
+    except asyncio.CancelledError:
+        raise
+    except BaseException:
+        attempt.pending -= 1
+        raise
+    attempt.pending -= 1
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    """
+    How calls for one feature are retried, hedged and cut off.
+
+    Every field can be overridden from the environment, globally with
+    OPENAI_<FIELD> or per feature with OPENAI_<FEATURE>_<FIELD>, e.g.
+    OPENAI_TRANSLATE_DEADLINE=20 or OPENAI_HEDGE=true.
+    """
+
+    deadline: float = 60.0
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    hedge: bool = False
+    hedge_min_delay: float = 1.0
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 30.0
+
+    @classmethod
+    def for_feature(cls, feature: str) -> "ResiliencePolicy":
+        policy = replace(cls(), **FEATURE_POLICIES.get(feature, {}))
+        readers = {int: env_int, float: env_float, bool: env_bool}
+        overrides = {}
+        for field in fields(cls):
+            read = readers[field.type]
+            value = getattr(policy, field.name)
+            value = read(f"OPENAI_{field.name.upper()}", value)
+            value = read(f"OPENAI_{feature.upper()}_{field.name.upper()}", value)
+            overrides[field.name] = value
+        return replace(policy, **overrides)
+
+
+# Built-in per-feature defaults. Short deterministic calls get tight deadlines
+# and hedging; long generations get more time and no duplicate requests.
+FEATURE_POLICIES: Dict[str, Dict[str, Any]] = {
+    "gpt": {"deadline": 90.0},
+    "talk": {"deadline": 90.0},
+    "quiz": {"deadline": 30.0, "hedge": True},
+    "translate": {"deadline": 30.0, "hedge": True},
+    "vocabulary": {"deadline": 20.0, "hedge": True},
+    "image": {"deadline": 60.0, "max_attempts": 2},
+    "random": {"deadline": 60.0},
+}
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `threshold` consecutive upstream failures.
+
+    After `cooldown` seconds a single trial call is let through; it closes
+    the circuit on success and opens it again on failure.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half-open" and self._trial_running):
+            raise CircuitOpenError("OpenAI circuit breaker is open")
+        if state == "half-open":
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_running or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit breaker opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def release_trial(self) -> None:
+        """Lets another trial through if the current one ended without a verdict."""
+        self._trial_running = False
+
+
+class Resilience:
+    """Applies deadlines, retries, hedging and circuit breaking per feature."""
+
+    def __init__(self):
+        self._policies: Dict[str, ResiliencePolicy] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self.retries = 0
+        self.hedges = 0
+        self.rejected = 0
+
+    def policy(self, feature: str) -> ResiliencePolicy:
+        if feature not in self._policies:
+            self._policies[feature] = ResiliencePolicy.for_feature(feature)
+        return self._policies[feature]
+
+    def breaker(self, feature: str) -> CircuitBreaker:
+        if feature not in self._breakers:
+            policy = self.policy(feature)
+            self._breakers[feature] = CircuitBreaker(
+                policy.breaker_threshold, policy.breaker_cooldown
+            )
+        return self._breakers[feature]
+
+    def latency(self, feature: str) -> LatencyTracker:
+        return self._latencies.setdefault(feature, LatencyTracker())
+
+    async def call(
+        self, feature: str, fn: Callable[[], Awaitable[T]], hedge: bool = True
+    ) -> T:
+        """
+        Runs `fn` under the feature's policy.
+
+        Args:
+            feature: Policy name, e.g. "translate"
+            fn: Factory for the call; invoked again for every retry or hedge
+            hedge: Allow hedged duplicates (disable for non-idempotent calls)
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            asyncio.TimeoutError: If the deadline passes
+            openai.OpenAIError: The last error once retries are exhausted
+        """
+        policy = self.policy(feature)
+        breaker = self.breaker(feature)
+        tracker = self.latency(feature)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + policy.deadline
+
+        for attempt in range(1, policy.max_attempts + 1):
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                self.rejected += 1
+                raise
+
+            started = loop.time()
+            attempt_state = Attempt(deadline=deadline)
+            token = current_attempt.set(attempt_state)
+            try:
+                if hedge and policy.hedge:
+                    call = self._hedged(fn, policy, tracker)
+                else:
+                    call = fn()
+                result = await asyncio.wait_for(call, deadline - started)
+            except RETRYABLE_ERRORS as e:
+                breaker.record_failure()
+                delay = random.uniform(
+                    0, min(policy.backoff_max, policy.backoff_base * 2 ** (attempt - 1))
+                )
+                if (
+                    attempt == policy.max_attempts
+                    or breaker.state != "closed"
+                    or loop.time() + delay >= deadline
+                ):
+                    logger.error(f"OpenAI call for {feature} failed: {e!r}")
+                    raise
+                self.retries += 1
+                logger.warning(
+                    f"OpenAI call for {feature} failed ({e!r}), "
+                    f"retry {attempt}/{policy.max_attempts - 1} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            except asyncio.TimeoutError:
+                if attempt_state.pending:
+                    # A request was still waiting on OpenAI
+                    breaker.record_failure()
+                else:
+                    # The deadline ran out in the rate limiter queue, which
+                    # says nothing about upstream health
+                    breaker.release_trial()
+                logger.error(f"OpenAI call for {feature} exceeded its deadline")
+                raise
+            except openai.APIStatusError as e:
+                if e.status_code >= 500 or e.status_code == 408:
+                    # Not retried, but the upstream failed to answer
+                    breaker.record_failure()
+                else:
+                    # The upstream answered, it just rejected this request
+                    breaker.record_success()
+                raise
+            except BaseException:
+                breaker.release_trial()
+                raise
+            finally:
+                current_attempt.reset(token)
+
+            tracker.record(loop.time() - started)
+            breaker.record_success()
+            return result
+
+    async def _hedged(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        policy: ResiliencePolicy,
+        tracker: LatencyTracker,
+    ) -> T:
+        """Sends a duplicate request if the first one runs past the observed p95."""
+        p95 = tracker.percentile(0.95)
+        if p95 is None:
+            return await fn()
+
+        tasks = [asyncio.ensure_future(fn())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=max(p95, policy.hedge_min_delay))
+            if not done:
+                self.hedges += 1
+                logger.info(f"Hedging OpenAI call after {p95:.2f}s")
+                tasks.append(asyncio.ensure_future(fn()))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "rejected": self.rejected,
+            "breakers": {
+                feature: breaker.state for feature, breaker in self._breakers.items()
+            },
+        }
@@ -0,0 +1,97 @@
+# services/response_cache.py
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def make_cache_key(model: str, messages: List[Dict[str, Any]], **params: Any) -> str:
+    """
+    Builds a canonical hash of a completion request.
+
+    Keys are serialized with sorted keys and no insignificant whitespace, so
+    two requests with the same model, messages and sampling parameters always
+    produce the same key.
+    """
+    payload = {"model": model, "messages": messages, "params": params}
+    canonical = json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache for deterministic completions.
+
+    Every entry has its own TTL. When the total size of cached keys and values
+    exceeds `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, max_bytes: int, default_ttl: float):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries: OrderedDict[str, Tuple[str, float, int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached value, or None on a miss or an expired entry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Stores a value, evicting least recently used entries to fit the budget."""
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current usage."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+        }
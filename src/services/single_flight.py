@@ -0,0 +1,53 @@
+# services/single_flight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Shares one in-flight call between concurrent callers with the same key.
+
+    The first caller starts the call as a separate task; callers arriving
+    while it runs await the same task instead of starting their own. The
+    task is shielded, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Runs `fn` once per key at a time and returns its result to every caller."""
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.info(f"Joined in-flight request {key[:12]}")
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns how many upstream calls were made and how many callers joined one."""
+        total = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / total, 3) if total else 0.0,
+            "in_flight": len(self._calls),
+        }
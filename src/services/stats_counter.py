@@ -0,0 +1,96 @@
+# services/stats_counter.py
+import asyncio
+from collections import Counter, defaultdict
+from typing import Any, Dict, Optional
+from database.crud import STAT_FIELDS, increment_user_stats
+from database.database import AsyncSessionLocal
+from database.models import User as DbUser
+from utils.config import env_int
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StatsCounter:
+    """
+    Coalesces user statistics increments in memory.
+
+    Handlers call `add`, which never awaits, so increments from concurrent
+    handlers cannot interleave. Every `flush_interval` seconds the pending
+    counts are swapped out and written as atomic `x = x + n` UPDATEs, one
+    row per user however many increments it collected. A failed flush puts
+    its counts back for the next attempt; at most one interval of counts is
+    lost if the process dies.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self.increments = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.failures = 0
+        self._pending: Dict[int, Counter] = defaultdict(Counter)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the flush loop and writes the remaining counts."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    def add(self, user: DbUser, stat_field: str, increment: int = 1) -> bool:
+        """
+        Counts an increment of a user statistic.
+
+        Returns:
+            False if the field is not a statistic
+        """
+        if stat_field not in STAT_FIELDS:
+            logger.error(f"Invalid stat field: {stat_field}")
+            return False
+        self._pending[user.id][stat_field] += increment
+        self.increments += 1
+        return True
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, defaultdict(Counter)
+        try:
+            async with AsyncSessionLocal() as db:
+                await increment_user_stats(
+                    db, {user_id: dict(fields) for user_id, fields in pending.items()}
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error flushing user statistics: {e}")
+            self.failures += 1
+            for user_id, fields in pending.items():
+                self._pending[user_id].update(fields)
+            return
+        self.rows_written += len(pending)
+        self.flushes += 1
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "increments": self.increments,
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "pending_users": len(self._pending),
+        }
+
+
+stats_counter = StatsCounter(flush_interval=env_int("STATS_FLUSH_MS", 1000) / 1000)
@@ -0,0 +1,155 @@
+# services/summarizer.py
+import asyncio
+from typing import Dict, Sequence, Tuple
+from database.crud import (
+    get_conversation_history,
+    get_conversation_range,
+    get_conversation_summary,
+    save_conversation_summary,
+)
+from database.database import AsyncSessionLocal
+from database.models import Conversation, User as DbUser
+from lexicon.prompts import CONVERSATION_SUMMARY_PROMPT, get_summary_update_prompt
+from services.context_builder import context_builder
+from services.openai_client import openai_client
+from services.rate_limiter import current_user_id
+from utils.config import env_int
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Most unsummarized messages loaded when compacting a conversation
+SUMMARY_FETCH_LIMIT = 200
+
+
+class ConversationSummarizer:
+    """
+    Folds older conversation turns into a stored running summary.
+
+    Once the unsummarized history grows past `trigger_tokens`, a background
+    task summarizes everything except the newest `keep_tokens` worth of
+    messages, so the prompt stays at a roughly fixed size. The oldest
+    unsummarized messages are folded in first, at most SUMMARY_FETCH_LIMIT
+    per run; a longer backlog is worked off by later runs. The task never
+    runs on the request path, and no database session is held while the
+    model writes the summary.
+    """
+
+    def __init__(self, trigger_tokens: int, keep_tokens: int):
+        self.trigger_tokens = trigger_tokens
+        self.keep_tokens = keep_tokens
+        self._tasks: Dict[Tuple[int, str], asyncio.Task] = {}
+
+    def schedule_if_needed(
+        self,
+        user: DbUser,
+        conversation_type: str,
+        history: Sequence[Conversation],
+        new_tokens: int = 0,
+    ) -> None:
+        """
+        Starts a background summarization if the unsummarized history is too long.
+
+        Args:
+            user: Owner of the conversation
+            conversation_type: Conversation to compact
+            history: Unsummarized messages that were just sent to the model
+            new_tokens: Tokens of the turn that was just added
+        """
+        tokens = new_tokens + sum(context_builder.message_tokens(m) for m in history)
+        if tokens < self.trigger_tokens:
+            return
+
+        key = (user.id, conversation_type)
+        task = self._tasks.get(key)
+        if task and not task.done():
+            return
+
+        logger.info(
+            f"Scheduling summary for user {user.id} {conversation_type} (~{tokens} tokens)"
+        )
+        task = asyncio.create_task(self._summarize(user, conversation_type))
+        self._tasks[key] = task
+        task.add_done_callback(lambda done: self._tasks.pop(key, None))
+
+    async def _summarize(self, user: DbUser, conversation_type: str) -> None:
+        current_user_id.set(None)
+        try:
+            async with AsyncSessionLocal() as db:
+                summary = await get_conversation_summary(db, user, conversation_type)
+                after_id = summary.last_message_id if summary else None
+                recent = await get_conversation_history(
+                    db, user, conversation_type, SUMMARY_FETCH_LIMIT, after_id
+                )
+
+                # Keep the newest messages verbatim, summarize the rest
+                kept = 0
+                cut = len(recent)
+                while cut > 0:
+                    tokens = context_builder.message_tokens(recent[cut - 1])
+                    if kept + tokens > self.keep_tokens:
+                        break
+                    kept += tokens
+                    cut -= 1
+                if cut == 0:
+                    return
+                older = await get_conversation_range(
+                    db,
+                    user,
+                    conversation_type,
+                    after_id,
+                    recent[cut].id if cut < len(recent) else None,
+                    SUMMARY_FETCH_LIMIT,
+                )
+            if not older:
+                return
+
+            transcript = "\n".join(f"{m.role}: {m.content}" for m in older)
+            new_summary = await openai_client.complete(
+                messages=[
+                    {"role": "system", "content": CONVERSATION_SUMMARY_PROMPT},
+                    {
+                        "role": "user",
+                        "content": get_summary_update_prompt(
+                            summary.summary if summary else None, transcript
+                        ),
+                    },
+                ],
+                model="gpt-4o-mini",
+                max_tokens=300,
+                temperature=0.3,
+                label="Conversation summary",
+                feature="summary",
+            )
+            if not new_summary:
+                return
+
+            async with AsyncSessionLocal() as db:
+                current = await get_conversation_summary(db, user, conversation_type)
+                if (current.last_message_id if current else None) != after_id:
+                    logger.info(
+                        f"Summary of user {user.id} {conversation_type} changed meanwhile"
+                    )
+                    return
+                await save_conversation_summary(
+                    db, user, conversation_type, new_summary.strip(), older[-1].id
+                )
+                await db.commit()
+            logger.info(
+                f"Summarized {len(older)} messages for user {user.id} {conversation_type}"
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error summarizing conversation {conversation_type}: {e}")
+
+    async def stop(self) -> None:
+        """Waits for running summaries to finish."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+summarizer = ConversationSummarizer(
+    trigger_tokens=env_int("SUMMARY_TRIGGER_TOKENS", 2000),
+    keep_tokens=env_int("SUMMARY_KEEP_TOKENS", 800),
+)
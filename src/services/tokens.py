@@ -0,0 +1,89 @@
+# services/tokens.py
+import importlib.util
+from typing import Any, Dict, List, Protocol
+from utils.config import env_str
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Average number of characters per token for English-like text
+CHARS_PER_TOKEN = 4
+# Formatting overhead the API adds for every message
+TOKENS_PER_MESSAGE = 4
+# Tokens that prime the assistant reply
+TOKENS_PER_REPLY = 3
+# Rough cost of one image part, between the low and high detail costs
+TOKENS_PER_IMAGE = 765
+# Fixed cost of a "low" detail image
+TOKENS_PER_LOW_DETAIL_IMAGE = 85
+
+
+class TokenEstimator(Protocol):
+    """Counts tokens in a piece of text without calling the API."""
+
+    def count(self, text: str) -> int: ...
+
+
+class HeuristicEstimator:
+    """Character-based estimate, roughly four characters per token."""
+
+    def count(self, text: str) -> int:
+        return estimate_text_tokens(text)
+
+
+class TiktokenEstimator:
+    """Exact counts with tiktoken; the encoding must be available locally."""
+
+    def __init__(self, encoding: str = "o200k_base"):
+        import tiktoken
+
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text)) if text else 0
+
+
+def create_token_estimator() -> TokenEstimator:
+    """
+    Builds the estimator selected by TOKEN_ESTIMATOR ("heuristic" or "tiktoken").
+
+    Falls back to the heuristic if tiktoken is not installed or its encoding
+    cannot be loaded offline.
+    """
+    name = (env_str("TOKEN_ESTIMATOR", "heuristic") or "heuristic").lower()
+    if name == "tiktoken":
+        if importlib.util.find_spec("tiktoken") is None:
+            logger.warning("TOKEN_ESTIMATOR=tiktoken but tiktoken is not installed")
+        else:
+            try:
+                return TiktokenEstimator()
+            except Exception as e:
+                logger.warning(f"Could not load tiktoken encoding: {e}")
+    return HeuristicEstimator()
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimates the number of tokens in a piece of text without a tokenizer."""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_messages_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimates the prompt tokens of a list of messages in OpenAI format."""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        content = message.get("content")
+        if isinstance(content, str):
+            total += estimate_text_tokens(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    total += estimate_text_tokens(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    if part.get("image_url", {}).get("detail") == "low":
+                        total += TOKENS_PER_LOW_DETAIL_IMAGE
+                    else:
+                        total += TOKENS_PER_IMAGE
+    return total
@@ -0,0 +1,157 @@
+# services/trace_recorder.py
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+from aiogram.types import Update
+from utils.config import env_bool, env_str
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Records buffered before they are appended to the trace file
+FLUSH_EVERY = 100
+# Personal fields removed from users, chats and messages; first_name is
+# required by the Bot API schema, so it is replaced instead
+PERSONAL_FIELDS = {
+    "last_name",
+    "username",
+    "title",
+    "phone_number",
+    "sender_user_name",
+    "author_signature",
+    "forward_sender_name",
+    "forward_signature",
+}
+PLACEHOLDER_NAME = "User"
+# Objects whose "id" identifies a person or chat, by the key they are under
+# or by a field only User ("is_bot") and Chat ("type") objects have an int
+# id next to, so users and chats are caught wherever the API nests them
+IDENTITY_KEYS = {"from", "chat", "user", "sender_chat", "forward_from", "via_bot"}
+IDENTITY_MARKERS = {"is_bot", "type"}
+# Free text replaced by filler of the same shape unless TRACE_KEEP_TEXT is set
+TEXT_FIELDS = {"text", "caption", "query"}
+# Links, e.g. of text_link entities, masked even with TRACE_KEEP_TEXT since
+# they can point at personal pages
+LINK_FIELDS = {"url"}
+FILE_FIELDS = {"file_id", "file_unique_id", "chat_instance"}
+# Update fields that carry content the bot never reads
+DROPPED_FIELDS = {"contact", "location", "venue", "reply_to_message"}
+WORD = re.compile(r"\w")
+
+
+class TraceRecorder:
+    """
+    Records incoming updates to a compact JSONL trace for replay benchmarks.
+
+    Every line holds the seconds since recording started, the anonymized
+    update, the FSM state before and after handling it and the handling
+    time. User and chat ids are replaced by keyed pseudonyms (stable for one
+    TRACE_SALT), names are replaced, links are masked and free text is
+    masked character by character, keeping length, whitespace and leading
+    commands. Users nested in entities (text_mention) are scrubbed like
+    any other user.
+    """
+
+    def __init__(self, path: Optional[str], keep_text: bool, salt: str):
+        self.path = path
+        self.keep_text = keep_text
+        self.salt = salt.encode("utf-8")
+        self.recorded = 0
+        self._buffer: List[str] = []
+        self._started = time.monotonic()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def pseudonym(self, value: int) -> int:
+        """Maps an id to a stable positive id that fits a 32-bit column."""
+        digest = hmac.new(self.salt, str(value).encode("utf-8"), hashlib.sha256)
+        return int(digest.hexdigest()[:12], 16) % 900_000_000 + 100_000_000
+
+    def mask(self, text: str) -> str:
+        if self.keep_text:
+            return text
+        command, space, rest = text.partition(" ")
+        if command.startswith("/"):
+            return command + space + WORD.sub("x", rest)
+        return WORD.sub("x", text)
+
+    def anonymize(self, value: Any, parent: Optional[str] = None) -> Any:
+        if isinstance(value, list):
+            return [self.anonymize(item, parent) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        identity = parent in IDENTITY_KEYS or not IDENTITY_MARKERS.isdisjoint(value)
+        result: Dict[str, Any] = {}
+        for key, item in value.items():
+            if key in PERSONAL_FIELDS or key in DROPPED_FIELDS:
+                continue
+            if key == "first_name":
+                result[key] = PLACEHOLDER_NAME
+            elif key == "id" and identity and isinstance(item, int):
+                result[key] = self.pseudonym(item)
+            elif key in TEXT_FIELDS and isinstance(item, str):
+                result[key] = self.mask(item)
+            elif key in LINK_FIELDS and isinstance(item, str):
+                result[key] = WORD.sub("x", item)
+            elif key in FILE_FIELDS and isinstance(item, str):
+                result[key] = hashlib.sha256(self.salt + item.encode()).hexdigest()[:16]
+            else:
+                result[key] = self.anonymize(item, key)
+        return result
+
+    def record(
+        self,
+        update: Update,
+        state_before: Optional[str],
+        state_after: Optional[str],
+        seconds: float,
+    ) -> None:
+        """Adds one handled update to the trace."""
+        payload = update.model_dump(mode="json", exclude_none=True, by_alias=True)
+        line = {
+            "t": round(time.monotonic() - self._started, 3),
+            "update": self.anonymize(payload),
+            "before": state_before,
+            "after": state_after,
+            "ms": round(seconds * 1000, 1),
+        }
+        self._buffer.append(json.dumps(line, ensure_ascii=False, separators=(",", ":")))
+        self.recorded += 1
+        if len(self._buffer) >= FLUSH_EVERY and not (
+            self._flush_task and not self._flush_task.done()
+        ):
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def stop(self) -> None:
+        """Writes the remaining buffered records."""
+        if self._flush_task:
+            await self._flush_task
+        await self._flush()
+        if self.enabled:
+            logger.info(f"Trace recorder wrote {self.recorded} updates to {self.path}")
+
+    async def _flush(self) -> None:
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: List[str]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+trace_recorder = TraceRecorder(
+    path=env_str("TRACE_FILE"),
+    keep_text=env_bool("TRACE_KEEP_TEXT", False),
+    salt=env_str("TRACE_SALT") or os.urandom(16).hex(),
+)
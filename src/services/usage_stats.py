@@ -0,0 +1,44 @@
+# services/usage_stats.py
+from collections import defaultdict
+from typing import Any, Dict
+
+
+class UsageStats:
+    """
+    Per-feature token usage, including prompt tokens served from the
+    upstream prompt cache (`usage.prompt_tokens_details.cached_tokens`).
+    """
+
+    def __init__(self):
+        self._features: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        )
+
+    def record(self, feature: str, usage: Any) -> int:
+        """
+        Adds the usage of one response.
+
+        Returns:
+            Number of cached prompt tokens in this response
+        """
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+
+        totals = self._features[feature]
+        totals["requests"] += 1
+        totals["prompt_tokens"] += usage.prompt_tokens or 0
+        totals["cached_tokens"] += cached
+        return cached
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            feature: {
+                **totals,
+                "cached_rate": (
+                    round(totals["cached_tokens"] / totals["prompt_tokens"], 3)
+                    if totals["prompt_tokens"]
+                    else 0.0
+                ),
+            }
+            for feature, totals in self._features.items()
+        }
@@ -0,0 +1,78 @@
+# services/user_cache.py
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from utils.config import env_float, env_int
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The columns of a users row that handlers read; stands in for the ORM object."""
+
+    id: int
+    telegram_id: int
+    username: Optional[str]
+
+
+class UserCache:
+    """
+    Bounded LRU cache of user rows by Telegram id.
+
+    Entries expire after `ttl` seconds. A lookup with a different username
+    than the cached one is a miss, so the caller's upsert stores the new
+    name and refreshes the entry.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[int, Tuple[UserSnapshot, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.renames = 0
+
+    def get(self, telegram_id: int, username: Optional[str]) -> Optional[UserSnapshot]:
+        """Returns the cached user, or None if it is missing, expired or renamed."""
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        user, expires_at = entry
+        renamed = user.username != username
+        if renamed or expires_at <= time.monotonic():
+            if renamed:
+                self.renames += 1
+            del self._entries[telegram_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        return user
+
+    def set(self, user: UserSnapshot) -> None:
+        self._entries[user.telegram_id] = (user, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user.telegram_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int) -> None:
+        self._entries.pop(telegram_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "renames": self.renames,
+            "entries": len(self._entries),
+        }
+
+
+user_cache = UserCache(
+    max_size=env_int("USER_CACHE_SIZE", 10000),
+    ttl=env_float("USER_CACHE_TTL", 300.0),
+)
@@ -0,0 +1,60 @@
+# services/vocabulary_counts.py
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.crud import count_vocabulary_words
+from database.models import User as DbUser
+from utils.config import env_float, env_int
+
+
+class VocabularyCounts:
+    """
+    Cached number of vocabulary words per user and language.
+
+    The vocabulary menu only shows the count, so it is read with a COUNT
+    query and kept in a bounded LRU for `ttl` seconds. Handlers that add
+    words call `invalidate` once the word is committed, so the next menu
+    shows the new count.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Tuple[int, str], Tuple[int, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, db: AsyncSession, user: DbUser, language: str) -> int:
+        key = (user.id, language)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        count = await count_vocabulary_words(db, user, language)
+        self._entries[key] = (count, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return count
+
+    def invalidate(self, user_id: int, language: str) -> None:
+        self._entries.pop((user_id, language), None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+vocabulary_counts = VocabularyCounts(
+    max_size=env_int("VOCABULARY_COUNT_CACHE_SIZE", 10000),
+    ttl=env_float("VOCABULARY_COUNT_TTL", 600.0),
+)
@@ -0,0 +1,71 @@
+# utils/config.py
+import os
+from os import getenv
+from typing import Optional
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+FALSE_VALUES = {"0", "false", "no", "off"}
+
+
+def env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Returns a stripped string variable, or the default if it is unset or empty."""
+    value = getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip()
+
+
+def env_path(name: str, filename: str) -> str:
+    """
+    Returns a file path variable, defaulting to `filename` in DATA_DIR.
+
+    DATA_DIR (default "data") holds the files the bot keeps between
+    restarts and is created when a default path is used.
+    """
+    value = env_str(name)
+    if value is not None:
+        return value
+    directory = env_str("DATA_DIR", "data")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def env_int(name: str, default: int) -> int:
+    """Returns an integer variable, falling back to the default on bad input."""
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid integer for {name}: {value!r}, using {default}")
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Returns a float variable, falling back to the default on bad input."""
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Invalid number for {name}: {value!r}, using {default}")
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Returns a boolean variable (1/0, true/false, yes/no, on/off)."""
+    value = env_str(name)
+    if value is None:
+        return default
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    logger.warning(f"Invalid boolean for {name}: {value!r}, using {default}")
+    return default
@@ -0,0 +1,136 @@
+# utils/live_message.py
+import asyncio
+from typing import Optional
+from aiogram import html
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup, Message
+from utils.config import env_float
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Telegram rejects messages longer than this
+MESSAGE_LIMIT = 4096
+# Minimum seconds between two edits of the same message
+EDIT_INTERVAL = env_float("LIVE_EDIT_INTERVAL", 1.0)
+# Shown at the end of the text while the reply is still being generated
+CURSOR = " ▌"
+# How far back from the limit to look for a newline or space to split on
+SPLIT_LOOKBACK = 200
+
+
+class LiveMessage:
+    """
+    Progressively edits a status message while text streams in.
+
+    Edits are throttled to one per `interval` seconds to stay under Telegram's
+    edit limits. When the text no longer fits into one message, the current
+    message is finalized and the rest continues in a new one.
+
+    Streamed text is HTML-escaped; `header` is inserted as is and only
+    shown on the first message.
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        header: str = "",
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        interval: float = EDIT_INTERVAL,
+        limit: int = MESSAGE_LIMIT,
+    ):
+        self.message = message
+        self.header = header
+        self.reply_markup = reply_markup
+        self.interval = interval
+        self.limit = limit
+        self.text = ""
+        self._page_start = 0
+        self._rendered: Optional[str] = None
+        self._next_edit_at = 0.0
+
+    def _render(self, body: str, cursor: bool = False) -> str:
+        """Builds the HTML text of the current message."""
+        prefix = self.header if self._page_start == 0 else ""
+        return prefix + html.quote(body) + (CURSOR if cursor else "")
+
+    def _page_text(self) -> str:
+        return self.text[self._page_start :]
+
+    def _split_point(self) -> int:
+        """Finds where the current message has to end so that it fits the limit."""
+        low, high = self._page_start, len(self.text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if len(self._render(self.text[self._page_start : middle])) <= self.limit:
+                low = middle
+            else:
+                high = middle - 1
+
+        window_start = max(self._page_start + 1, low - SPLIT_LOOKBACK)
+        for separator in ("\n", " "):
+            position = self.text.rfind(separator, window_start, low)
+            if position != -1:
+                return position + 1
+        return max(low, self._page_start + 1)
+
+    async def _edit(self, text: str, reply_markup=None, wait: bool = False) -> None:
+        """Edits the current message, skipping no-op edits and honoring flood control."""
+        if text == self._rendered and reply_markup is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await self.message.edit_text(text, reply_markup=reply_markup)
+                break
+            except TelegramRetryAfter as e:
+                logger.warning(f"Live message edit throttled for {e.retry_after}s")
+                if not wait:
+                    self._next_edit_at = loop.time() + e.retry_after
+                    return
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                if "message is not modified" not in str(e):
+                    raise
+                break
+
+        self._rendered = text
+        self._next_edit_at = loop.time() + self.interval
+
+    async def _rollover(self) -> None:
+        """Moves overflowing text into new messages."""
+        while len(self._render(self._page_text(), cursor=True)) > self.limit:
+            cut = self._split_point()
+            await self._edit(self._render(self.text[self._page_start : cut]), wait=True)
+            self._page_start = cut
+            self.message = await self.message.answer(CURSOR.strip())
+            self._rendered = CURSOR.strip()
+            self._next_edit_at = 0.0
+
+    async def append(self, delta: str) -> None:
+        """Adds streamed text and updates the message if the throttle allows it."""
+        self.text += delta
+        await self._rollover()
+
+        if asyncio.get_running_loop().time() >= self._next_edit_at:
+            await self._edit(self._render(self._page_text(), cursor=True))
+
+    async def finish(self) -> str:
+        """
+        Shows the complete text with the reply markup attached.
+
+        Returns:
+            The full streamed text, or an empty string if nothing arrived
+            (the message is left untouched in that case)
+        """
+        if not self.text:
+            return ""
+
+        await self._rollover()
+        await self._edit(
+            self._render(self._page_text()),
+            reply_markup=self.reply_markup,
+            wait=True,
+        )
+        return self.text